@@ -0,0 +1,454 @@
+#!/usr/bin/env python
+from __future__ import with_statement
+from builderror import BuildError
+from optparse import OptionParser
+
+import bootapp
+import build
+import buildutil
+import codecs
+import create_project
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+LOCALES = ["en_US", "nl_NL", "de_DE", "fr_FR", "es_ES", "it_IT", "pt_BR", "pl_PL",
+           "sv_SE", "da_DK", "nb_NO", "fi_FI", "tr_TR", "ja_JP", "zh_CN", "ru_RU"]
+
+DEFAULT_FILE_NAME_PATTERN = buildutil.fileNamePattern
+
+
+def parseOptions():
+    usage = "Usage: %prog [options]"
+    parser = OptionParser(usage = usage)
+    parser.add_option("", "--modules", dest = "numModules", default = 10, type = "int",
+                      help = "The number of modules to generate, besides boot and core")
+    parser.add_option("", "--sources", dest = "numSources", default = 5, type = "int",
+                      help = "The number of JavaScript sources per module")
+    parser.add_option("", "--locales", dest = "numLocales", default = 2, type = "int",
+                      help = "The number of locales (at most %d)" % len(LOCALES))
+    parser.add_option("", "--templates", dest = "numTemplates", default = 3, type = "int",
+                      help = "The number of templates per module")
+    parser.add_option("", "--styles", dest = "numStyles", default = 2, type = "int",
+                      help = "The number of SCSS files per module")
+    parser.add_option("", "--target", dest = "targets", action = "append",
+                      help = "Benchmarks only the given target (may be repeated, defaults to all targets)")
+    parser.add_option("", "--repeat", dest = "repeat", default = 3, type = "int",
+                      help = "The number of times to repeat every measurement")
+    parser.add_option("", "--project-dir", dest = "projectDir",
+                      help = "Generates the project in the given directory, and keeps it afterwards")
+    parser.add_option("", "--output", dest = "output", default = "benchmark.json",
+                      help = "The file to write the results to")
+    parser.add_option("", "--boot-page-requests", dest = "bootPageRequests", default = 0, type = "int",
+                      help = "Also measures serving the boot page by CGI and WSGI, using the given number of requests")
+    parser.add_option("", "--verbose", action = "store_true",
+                      help = "Shows the output of the builds")
+
+    (options, args) = parser.parse_args()
+    if options.numLocales < 1 or options.numLocales > len(LOCALES):
+        parser.error("The number of locales should be between 1 and %d" % len(LOCALES))
+    if options.numModules < 1:
+        parser.error("At least one module should be generated")
+
+    return options
+
+def writeFile(path, content):
+    with codecs.open(path, "w", "utf-8") as f:
+        f.write(content)
+
+def readFile(path):
+    with codecs.open(path, "r", "utf-8") as f:
+        return f.read()
+
+def translate(locales, text):
+    return dict((locale, "%s (%s)" % (text, locale)) for locale in locales)
+
+""" Generates a project with the layout of create_project.py, extended with
+    the requested number of modules, sources, locales, templates and SCSS
+    files. """
+def generateProject(projectDir, options):
+    create_project.createProject("Benchmark", projectDir, "Benchmark")
+
+    locales = LOCALES[:options.numLocales]
+
+    manifestPath = projectDir + "/project-manifest.json"
+    manifest = json.loads(readFile(manifestPath))
+    manifest["locales"] = locales
+    manifest["defaultLocale"] = locales[0]
+
+    # the core translations need to cover all locales
+    translationsPath = projectDir + "/modules/core/i18n/translations.json"
+    translations = json.loads(readFile(translationsPath))
+    for values in translations.values():
+        for locale in locales:
+            if not locale in values:
+                values[locale] = values["en_US"]
+    writeFile(translationsPath, json.dumps(translations, indent = 4, sort_keys = True))
+
+    for index in range(options.numModules):
+        moduleName = "module%d" % index
+        generateModule(projectDir + "/modules/" + moduleName, index, locales, options)
+        manifest["modules"].append({ "name": moduleName })
+
+    writeFile(manifestPath, json.dumps(manifest, indent = 4))
+
+def generateModule(modulePath, index, locales, options):
+    moduleName = "module%d" % index
+    className = "Module%d" % index
+    keyPrefix = "MODULE%d" % index
+
+    for directory in ["js", "tmpl", "css", "i18n"]:
+        os.makedirs(modulePath + "/" + directory)
+
+    translations = {}
+
+    sources = []
+    for sourceIndex in range(options.numSources):
+        fileName = "%s.%d.js" % (moduleName, sourceIndex)
+        if sourceIndex == 0:
+            fileName = "%s.tile.js" % moduleName
+            content = (
+                "function %(className)sTile(container, params) {\n"
+                "\n"
+                "    function realize() {\n"
+                "\n"
+                "        $.tmpl(\"%(moduleName)s.template0\", { \"id\": params.id }).appendTo(container);\n"
+                "    }\n"
+                "\n"
+                "    return {\n"
+                "        \"realize\": realize\n"
+                "    };\n"
+                "}\n"
+            ) % { "className": className, "moduleName": moduleName }
+        else:
+            key = "%s_SOURCE%d" % (keyPrefix, sourceIndex)
+            translations[key] = translate(locales, "Text of source %d in module %d" % (sourceIndex, index))
+            functions = []
+            for functionIndex in range(20):
+                functions.append(
+                    "    function helper%(functionIndex)d(items) {\n"
+                    "        var result = [];\n"
+                    "        for (var i = 0; i < items.length; i++) {\n"
+                    "            result.push(items[i] + \" %(functionIndex)d\");\n"
+                    "        }\n"
+                    "        return result.join(\", \");\n"
+                    "    }\n" % { "functionIndex": functionIndex }
+                )
+            content = (
+                "var %(className)sHelpers%(sourceIndex)d = function() {\n"
+                "\n"
+                "%(functions)s"
+                "\n"
+                "    return {\n"
+                "        \"label\": \"[[%(key)s]]\",\n"
+                "        \"helper\": helper0\n"
+                "    };\n"
+                "}();\n"
+            ) % { "className": className, "sourceIndex": sourceIndex, "functions": "\n".join(functions), "key": key }
+        writeFile(modulePath + "/js/" + fileName, content)
+        sources.append({ "path": fileName })
+
+    for templateIndex in range(options.numTemplates):
+        key = "%s_TEMPLATE%d" % (keyPrefix, templateIndex)
+        translations[key] = translate(locales, "Text of template %d in module %d" % (templateIndex, index))
+        template = (
+            "<!-- template id=\"template%(templateIndex)d\" -->\n"
+            "<div class=\"%(moduleName)s-template%(templateIndex)d\">\n"
+            "    <h2>[[%(key)s]]</h2>\n"
+            "    <p><a href=\"#\" class=\"action-%(moduleName)s\">[[%(key)s]]</a></p>\n"
+            "</div>\n"
+            "<!-- /template id=\"template%(templateIndex)d\" -->\n"
+        ) % { "templateIndex": templateIndex, "moduleName": moduleName, "key": key }
+
+        # one for each of the template features
+        writeFile(modulePath + "/tmpl/template%d.tmpl.html" % templateIndex, template)
+        writeFile(modulePath + "/tmpl/template%d.moustache.html" % templateIndex, template)
+
+    styles = []
+    for styleIndex in range(options.numStyles):
+        fileName = "%s.%d.scss" % (moduleName, styleIndex)
+        if styleIndex == 0:
+            content = (
+                "@import \"compass/css3/border-radius\";\n"
+                "\n"
+                "$%(moduleName)sColor: #%(color)06x;\n"
+                "\n"
+                "@mixin %(moduleName)sBox($radius) {\n"
+                "    @include border-radius($radius);\n"
+                "    border: 1px solid $%(moduleName)sColor;\n"
+                "}\n"
+            ) % { "moduleName": moduleName, "color": (index * 0x102030) % 0x1000000 }
+        else:
+            content = ""
+        for ruleIndex in range(10):
+            content += (
+                "\n"
+                ".%(moduleName)s-style%(styleIndex)d-rule%(ruleIndex)d {\n"
+                "    @include %(moduleName)sBox(%(ruleIndex)dpx);\n"
+                "    padding: %(ruleIndex)dpx;\n"
+                "\n"
+                "    h2 {\n"
+                "        color: $%(moduleName)sColor;\n"
+                "    }\n"
+                "}\n"
+            ) % { "moduleName": moduleName, "styleIndex": styleIndex, "ruleIndex": ruleIndex }
+        writeFile(modulePath + "/css/" + fileName, content)
+        styles.append({ "path": fileName })
+
+    writeFile(modulePath + "/i18n/translations.json", json.dumps(translations, indent = 4, sort_keys = True))
+
+    # every other module depends on its predecessor, to get some depth in the
+    # dependency graph
+    dependencies = ["core"]
+    if index % 2 == 1:
+        dependencies.append("module%d" % (index - 1))
+
+    writeFile(modulePath + "/manifest.json", json.dumps({
+        "namespace": "Benchmark",
+        "dependencies": dependencies,
+        "sources": sources,
+        "styles": styles,
+        "statics": []
+    }, indent = 4))
+
+""" Returns the changes to make for measuring single-file-change rebuilds, as
+    tuples (name, path, function modifying the file's content). The changes
+    are made in the middle module, so that dependent modules are affected as
+    well. """
+def getChanges(projectDir, options):
+    index = options.numModules / 2
+    modulePath = projectDir + "/modules/module%d" % index
+
+    def changeTranslations(content):
+        translations = json.loads(content)
+        for values in translations.values():
+            for locale in values:
+                values[locale] += "!"
+        return json.dumps(translations, indent = 4, sort_keys = True)
+
+    changes = [
+        ("js", modulePath + "/js/module%d.tile.js" % index,
+         lambda content: content + "\nvar benchmarkChange = true;\n")
+    ]
+    if options.numTemplates > 0:
+        for extension in ["tmpl", "moustache"]:
+            changes.append((extension + "Template", modulePath + "/tmpl/template0.%s.html" % extension,
+                            lambda content: content.replace("</h2>", "!</h2>")))
+    if options.numStyles > 0:
+        changes.append(("style", modulePath + "/css/module%d.0.scss" % index,
+                        lambda content: content + "\n.benchmark-change {\n    margin: 0px;\n}\n"))
+    changes.append(("translations", modulePath + "/i18n/translations.json", changeTranslations))
+
+    return changes
+
+class SilencedOutput(object):
+
+    def __init__(self, silenced):
+        self.silenced = silenced
+
+    def __enter__(self):
+        if self.silenced:
+            self.stdout = sys.stdout
+            sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, type, value, traceback):
+        if self.silenced:
+            sys.stdout.close()
+            sys.stdout = self.stdout
+        return False
+
+def createBuilder(projectDir, target, buildDir):
+    config = build.Config()
+    config.projectManifest = projectDir + "/project-manifest.json"
+    config.target = target
+    config.buildDir = buildDir
+
+    # targets without a file name pattern don't reset the one of the
+    # previously built target
+    buildutil.fileNamePattern = DEFAULT_FILE_NAME_PATTERN
+
+    return build.ProjectBuilder(config)
+
+""" Returns the Git revision of Sherman, if available, so results can be
+    compared between versions. """
+def getShermanVersion():
+    try:
+        pipe = subprocess.Popen(["git", "rev-parse", "HEAD"], cwd = os.path.dirname(os.path.abspath(__file__)),
+                                stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        (stdoutdata, stderrdata) = pipe.communicate()
+        return stdoutdata.strip() if pipe.returncode == 0 else None
+    except OSError:
+        return None
+
+def timeBuild(function):
+    startTime = time.time()
+    function()
+    return time.time() - startTime
+
+""" Measures a cold build, a warm rebuild without changes, and a rebuild after
+    each single-file change, repeating every measurement. Files are restored
+    after every change. """
+def benchmarkTarget(projectDir, target, changes, options):
+    results = {
+        "coldBuild": [],
+        "warmRebuild": [],
+        "singleFileChange": dict((name, []) for (name, path, change) in changes)
+    }
+
+    for run in range(options.repeat):
+        buildDir = tempfile.mkdtemp(".build", "sherman-benchmark.")
+        try:
+            with SilencedOutput(not options.verbose):
+                startTime = time.time()
+                builder = createBuilder(projectDir, target, buildDir)
+                builder.build()
+                results["coldBuild"].append(time.time() - startTime)
+
+                results["warmRebuild"].append(timeBuild(builder.build))
+
+                for (name, path, change) in changes:
+                    original = readFile(path)
+                    try:
+                        writeFile(path, change(original))
+                        results["singleFileChange"][name].append(timeBuild(builder.build))
+                    finally:
+                        writeFile(path, original)
+                    builder.build()
+        finally:
+            shutil.rmtree(buildDir)
+
+    return summarize(results)
+
+""" Measures the time taken to serve the boot page of the default locale a
+    number of times, by cgi-bin/index.py started as a new process for every
+    request like a CGI server does, and by the WSGI application of bootapp.py
+    called directly. """
+def benchmarkBootPage(projectDir, target, options):
+    results = {
+        "cgi": [],
+        "wsgi": []
+    }
+
+    buildDir = tempfile.mkdtemp(".build", "sherman-benchmark.")
+    try:
+        with SilencedOutput(not options.verbose):
+            builder = createBuilder(projectDir, target, buildDir)
+            builder.build()
+
+        # the script reads the project manifest from its working directory
+        shutil.copy(projectDir + "/project-manifest.json", buildDir)
+
+        query = "locale=" + builder.projectManifest["defaultLocale"]
+        scriptPath = os.path.dirname(os.path.abspath(__file__)) + "/cgi-bin/index.py"
+        scriptEnviron = dict(os.environ, GATEWAY_INTERFACE = "CGI/1.1", REQUEST_METHOD = "GET", QUERY_STRING = query)
+        application = bootapp.BootPageApplication(buildDir)
+        environ = { "REQUEST_METHOD": "GET", "QUERY_STRING": query }
+
+        def runScript():
+            for i in range(options.bootPageRequests):
+                pipe = subprocess.Popen([sys.executable, scriptPath], cwd = buildDir, env = scriptEnviron,
+                                        stdout = subprocess.PIPE)
+                pipe.communicate()
+                if pipe.returncode != 0:
+                    raise BuildError("cgi-bin/index.py failed with exit code %d" % pipe.returncode)
+
+        def callApplication():
+            for i in range(options.bootPageRequests):
+                "".join(application(environ, lambda status, headers: None))
+
+        for run in range(options.repeat):
+            results["cgi"].append(timeBuild(runScript))
+            results["wsgi"].append(timeBuild(callApplication))
+    finally:
+        shutil.rmtree(buildDir)
+
+    summary = summarize(results)
+    for key in summary:
+        summary[key]["requestsPerSecond"] = options.bootPageRequests / summary[key]["median"]
+    return summary
+
+def summarize(results):
+    summary = {}
+    for (key, value) in results.items():
+        if isinstance(value, dict):
+            summary[key] = summarize(value)
+        elif len(value) > 0:
+            times = sorted(value)
+            summary[key] = {
+                "times": value,
+                "min": times[0],
+                "median": times[len(times) / 2],
+                "max": times[-1]
+            }
+    return summary
+
+if __name__ == "__main__":
+    options = parseOptions()
+
+    if options.projectDir:
+        projectDir = os.path.abspath(options.projectDir)
+    else:
+        projectDir = tempfile.mkdtemp(".project", "sherman-benchmark.") + "/benchmark"
+
+    try:
+        print "Generating project in %s..." % projectDir
+        generateProject(projectDir, options)
+
+        manifest = json.loads(readFile(projectDir + "/project-manifest.json"))
+        targets = options.targets or sorted(manifest["targets"])
+        changes = getChanges(projectDir, options)
+
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sherman": getShermanVersion(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                "modules": options.numModules,
+                "sources": options.numSources,
+                "locales": options.numLocales,
+                "templates": options.numTemplates,
+                "styles": options.numStyles,
+                "repeat": options.repeat,
+                "bootPageRequests": options.bootPageRequests
+            },
+            "targets": {}
+        }
+
+        for target in targets:
+            print "Benchmarking target %s..." % target
+            try:
+                report["targets"][target] = benchmarkTarget(projectDir, target, changes, options)
+                print "  Cold build: %.2fs, warm rebuild: %.2fs" % (report["targets"][target]["coldBuild"]["median"],
+                                                                     report["targets"][target]["warmRebuild"]["median"])
+            except BuildError, error:
+                message = error.extendMessage(str(error), error.originalException)
+                print "  Failed: %s" % message
+                report["targets"][target] = { "error": message }
+
+        if options.bootPageRequests > 0:
+            print "Benchmarking boot page requests for target %s..." % targets[0]
+            try:
+                report["bootPage"] = benchmarkBootPage(projectDir, targets[0], options)
+                print "  CGI: %.0f requests/s, WSGI: %.0f requests/s" % (report["bootPage"]["cgi"]["requestsPerSecond"],
+                                                                         report["bootPage"]["wsgi"]["requestsPerSecond"])
+            except BuildError, error:
+                message = error.extendMessage(str(error), error.originalException)
+                print "  Failed: %s" % message
+                report["bootPage"] = { "error": message }
+
+        writeFile(options.output, json.dumps(report, indent = 4, sort_keys = True))
+        print "Wrote results to %s." % options.output
+    finally:
+        if not options.projectDir:
+            shutil.rmtree(os.path.dirname(projectDir), True)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+from __future__ import with_statement
+from optparse import OptionParser
+
+import bootpage
+import os
+import re
+import sys
+import time
+import urlparse
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+VERSION_FILE_PATTERN = re.compile(r"^__version__\.([^.]+)(\.debug)?\.md5$")
+
+
+""" The default config provider, passing no configuration to the
+    application. """
+def emptyConfig(environ, locale):
+    return "{}"
+
+""" Returns a config provider passing the given configuration to the application
+    for every request. """
+def staticConfig(config):
+    serialized = json.dumps(config)
+    return lambda environ, locale: serialized
+
+
+# A WSGI application serving the boot page of a build, for use in production in
+# place of cgi-bin/index.py:
+#
+#     import bootapp
+#     application = bootapp.BootPageApplication("/path/to/build", defaultLocale = "en_US",
+#                                               staticBase = "http://static.example.com/",
+#                                               configProvider = bootapp.staticConfig({ "api": "/api/" }))
+#
+# The boot HTML of every locale is kept in memory, parsed as a template, so
+# requests don't touch the disk. The version files of the build are checked
+# at most once every checkInterval seconds per locale; as they are replaced
+# atomically, and only after the boot HTML they refer to is written, a new
+# build is picked up as soon as its version file is in place. If the boot HTML
+# of a new version can't be read, the previous version is served until it can.
+#
+# The config provider is called for every request with the WSGI environ and the
+# locale, and should return the JavaScript object to pass to the application's
+# init() method, as a string.
+class BootPageApplication(object):
+
+    def __init__(self, buildDir, locales = None, defaultLocale = None, staticBase = "",
+                 configProvider = emptyConfig, checkInterval = 1):
+        self.buildDir = buildDir
+        self.staticBase = staticBase
+        self.configProvider = configProvider
+        self.checkInterval = checkInterval
+
+        # distribution builds don't include the project manifest, so fall back
+        # to the locales having a version file, but the default locale can't
+        # be guessed
+        manifestPath = buildDir + "/project-manifest.json"
+        if (locales is None or defaultLocale is None) and os.path.exists(manifestPath):
+            with open(manifestPath, "r") as f:
+                manifest = json.load(f)
+            locales = locales or manifest["locales"]
+            defaultLocale = defaultLocale or manifest["defaultLocale"]
+        if locales is None:
+            matches = [VERSION_FILE_PATTERN.match(fileName) for fileName in os.listdir(buildDir)]
+            locales = sorted(set(match.group(1) for match in matches if match))
+        if not locales:
+            raise ValueError("No locales found in build directory %s" % buildDir)
+        if defaultLocale is None:
+            raise ValueError("No default locale given, and no project manifest in build directory %s" % buildDir)
+        if not defaultLocale in locales:
+            raise ValueError("Default locale %s is not among the locales %s" % (defaultLocale, ", ".join(locales)))
+
+        self.locales = [str(locale) for locale in locales]
+        self.defaultLocale = str(defaultLocale)
+
+        # locale => (time of last check, signature of the version file, BootPageTemplate)
+        #
+        # entries are replaced as a whole, so requests in other threads always
+        # see a consistent entry
+        self.pages = {}
+
+    def __call__(self, environ, start_response):
+        query = urlparse.parse_qs(environ.get("QUERY_STRING", ""))
+        locale = query.get("locale", [self.defaultLocale])[0]
+        if not locale in self.locales:
+            return self.respond(start_response, "400 Bad Request", "text/plain",
+                                "Unsupported locale, must be one of %s" % ", ".join(self.locales))
+
+        template = self.getTemplate(locale)
+        if not template:
+            return self.respond(start_response, "404 Not Found", "text/plain",
+                                "No boot page for locale %s" % locale)
+
+        config = self.configProvider(environ, locale)
+        if isinstance(config, unicode):
+            config = config.encode("utf-8")
+
+        return self.respond(start_response, "200 OK", "text/html", template.render(self.staticBase, config))
+
+    def respond(self, start_response, status, contentType, content):
+        start_response(status, [
+            ("Content-Type", contentType),
+            ("Content-Length", str(len(content))),
+            ("Cache-Control", "no-cache")
+        ])
+        return [content]
+
+    """ Returns the template of the current boot page of a locale, loading it
+        if the version file changed since it was last checked. """
+    def getTemplate(self, locale):
+        now = time.time()
+        entry = self.pages.get(locale, (None, None, None))
+        (checkedAt, signature, template) = entry
+        if checkedAt is not None and now - checkedAt < self.checkInterval:
+            return template
+
+        # like cgi-bin/index.py, fall back to the version file of debug builds
+        for extra in ("", ".debug"):
+            versionPath = "%s/__version__.%s%s.md5" % (self.buildDir, locale, extra)
+            try:
+                stat = os.stat(versionPath)
+                break
+            except OSError:
+                pass
+        else:
+            # keep serving what we have while the build directory is replaced
+            self.pages[locale] = (now, signature, template)
+            return template
+
+        newSignature = (versionPath, stat.st_ino, stat.st_mtime, stat.st_size)
+        if newSignature != signature:
+            try:
+                with open(versionPath, "r") as f:
+                    version = f.read().strip()
+                with open("%s/boot.%s.%s%s.html" % (self.buildDir, version, locale, extra), "rb") as f:
+                    template = bootpage.BootPageTemplate(f.read())
+                signature = newSignature
+            except (IOError, OSError), error:
+                print >> sys.stderr, "Could not load boot page for locale %s: %s" % (locale, error)
+
+        self.pages[locale] = (now, signature, template)
+        return template
+
+
+def parseOptions():
+    usage = "Usage: %prog [options]"
+    parser = OptionParser(usage = usage)
+    parser.add_option("", "--build-dir", dest = "buildDir", default = "build",
+                      help = "The build directory to serve the boot page from")
+    parser.add_option("", "--port", dest = "port", default = 8080, type = "int",
+                      help = "The port to listen on")
+    parser.add_option("", "--default-locale", dest = "defaultLocale",
+                      help = "The locale to serve if none is requested, required if the build directory has no project manifest")
+    parser.add_option("", "--static-base", dest = "staticBase", default = "",
+                      help = "The base URL of the other files of the build")
+    parser.add_option("", "--config", dest = "config", default = "{}",
+                      help = "The JSON config to pass to the application")
+
+    (options, args) = parser.parse_args()
+    try:
+        options.config = json.loads(options.config)
+    except ValueError, error:
+        parser.error("Invalid config: %s" % error)
+
+    return options
+
+if __name__ == "__main__":
+    from wsgiref.simple_server import make_server
+
+    options = parseOptions()
+
+    try:
+        application = BootPageApplication(os.path.abspath(options.buildDir), defaultLocale = options.defaultLocale,
+                                          staticBase = options.staticBase, configProvider = staticConfig(options.config))
+    except (ValueError, IOError, OSError), error:
+        print "Could not serve the boot page: %s" % error
+        sys.exit(1)
+
+    print "Serving the boot page at http://localhost:%i/" % options.port
+    make_server("", options.port, application).serve_forever()
@@ -0,0 +1,59 @@
+import re
+
+
+PLACEHOLDER_PATTERN = re.compile(r"(\[static_base\]|\[config\])")
+
+
+# A boot HTML file, split on its [static_base] and [config] placeholders so that
+# rendering it is a matter of joining the parts with the values filled in.
+class BootPageTemplate(object):
+
+    def __init__(self, html):
+        # literal parts at even indices, placeholders at odd indices
+        self.parts = PLACEHOLDER_PATTERN.split(html)
+
+    """ Returns the HTML with the placeholders replaced by the given static base
+        and config. """
+    def render(self, staticBase, config):
+        values = { "[static_base]": staticBase, "[config]": config }
+
+        parts = list(self.parts)
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+
+# Keeps the boot pages of the current build in memory, so that they can be
+# rendered without reading the version file and the boot HTML from disk, as the
+# cgi-bin/index.py script does.
+#
+# Like on disk, a new boot HTML only takes effect once the version file of its
+# locale points to it, at which point the templates of previous versions are
+# dropped.
+class BootPageCache(object):
+
+    def __init__(self):
+        # locale => version
+        self.versions = {}
+
+        # (locale, version) => BootPageTemplate
+        self.templates = {}
+
+    def addBootHtml(self, locale, version, html):
+        self.templates[(locale, version)] = BootPageTemplate(html)
+
+    def setVersion(self, locale, version):
+        self.versions[locale] = version
+
+        for key in self.templates.keys():
+            if key[0] == locale and key[1] != version:
+                del self.templates[key]
+
+    """ Returns the rendered boot page of the given locale, or None if there is
+        none. """
+    def render(self, locale, staticBase = "", config = "{}"):
+        template = self.templates.get((locale, self.versions.get(locale)))
+        if not template:
+            return None
+
+        return template.render(staticBase, config)
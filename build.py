@@ -3,17 +3,31 @@ from builderror import BuildError
 from optparse import OptionParser
 
 import base64
+import buildcache
+import buildmanifest
+import builddaemon
+import buildprofiler
+import buildscheduler
 import buildutil
-import codecs
-import distutils.dir_util
+import contentstore
+import copy
+import devserver
+import filewatcher
 import imp
+import localepool
+import modifiedfiles
+import modulereleaser
+import modulestate
 import os
-import random
+import outputcompressor
+import outputwriter
+import pathindex
 import shutil
 import signal
 import shermanfeature
 import sys
 import tempfile
+import threading
 import time
 
 try:
@@ -21,9 +35,17 @@ try:
 except ImportError:
     import simplejson as json
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 builder = None
 
+# resolved on import, as the build daemon changes the working directory
+SHERMAN_DIR = os.path.abspath(os.path.dirname(__file__))
+
 
 def onInterrupt(signum, frame):
     if not builder.config.buildDir:
@@ -33,11 +55,11 @@ def onInterrupt(signum, frame):
     exit()
 
 
-def parseOptions():
+def parseOptions(args = None):
     usage = "Usage: %prog [options] [<project_manifest>]"
     parser = OptionParser(usage = usage)
     parser.add_option("", "--target", dest = "target", default = "distribution",
-                      help = "Selects the target to build")
+                      help = "Selects the target to build, or a comma-separated list of targets to build one after another")
     parser.add_option("", "--serve", action = "store_true",
                       help = "Serve the project from the built-in webserver on localhost")
     parser.add_option("", "--port", dest = "port",
@@ -46,15 +68,44 @@ def parseOptions():
     parser.add_option("", "--simulate-high-latency", dest = "simulateHighLatency", action = "store_true",
                       help = "Simulates the effect of high network latency when serving")
     parser.add_option("", "--continuous-build", dest = "continuousBuild", action = "store_true",
-                      help = "Keeps building the project continuously (warning: consumes a lot of CPU)")
+                      help = "Watches the project for changes, and rebuilds the affected modules")
+    parser.add_option("", "--daemon", action = "store_true",
+                      help = "Keeps running in the background, and runs the builds requested through buildclient.py")
+    parser.add_option("", "--socket", dest = "socket",
+                      help = "The Unix socket on which the build daemon listens (default: .sherman-daemon.sock in the project directory)")
     parser.add_option("", "--build-dir", dest = "buildDir",
                       help = "Specifies the directory to create the build in")
-
-    (options, args) = parser.parse_args()
+    parser.add_option("", "--jobs", dest = "jobs",
+                      default = 1, type = "int",
+                      help = "The number of modules to build concurrently")
+    parser.add_option("", "--locale-jobs", dest = "localeJobs",
+                      default = 1, type = "int",
+                      help = "The number of processes to use for building the locales of a module")
+    parser.add_option("", "--cache", action = "store_true",
+                      help = "Caches built modules in the project's .sherman-cache directory, so unchanged modules can be restored by later builds")
+    parser.add_option("", "--cache-size", dest = "cacheSize",
+                      default = 512, type = "int",
+                      help = "The size in megabytes above which the least recently used entries are removed from the cache after a build")
+    parser.add_option("", "--gzip", action = "store_true",
+                      help = "Writes a gzipped copy next to every JavaScript, CSS, HTML and JSON output file")
+    parser.add_option("", "--low-memory", dest = "lowMemory", action = "store_true",
+                      help = "Releases the intermediate results of modules as soon as they are written, and reports the peak memory usage; for single builds only")
+    parser.add_option("", "--hook-timings", dest = "hookTimings", action = "store_true",
+                      help = "Prints the time spent in every feature hook after building")
+    parser.add_option("", "--profile-build", dest = "profileBuild", action = "store_true",
+                      help = "Writes the time spent in every phase of the build to build-profile.json, and a Chrome trace to build-profile.trace.json, in the project directory")
+
+    (options, args) = parser.parse_args(args)
 
     config = Config()
     config.projectManifest = os.path.abspath(args[0] if len(args) >= 1 else "project-manifest.json")
-    config.target = options.target
+    config.targets = options.target.split(",")
+    config.target = config.targets[0]
+
+    if len(config.targets) > 1 and (options.serve or options.continuousBuild or options.daemon):
+        parser.error("Only a single target can be served or built continuously")
+    if options.lowMemory and (options.serve or options.continuousBuild or options.daemon):
+        parser.error("Low-memory mode is only available for single builds")
 
     if options.serve:
         config.serve = True
@@ -67,27 +118,96 @@ def parseOptions():
     if options.continuousBuild:
         config.continuousBuild = True
 
+    if options.daemon:
+        config.daemon = True
+
+    config.socket = options.socket
+
     if options.buildDir:
         config.buildDir = options.buildDir
 
+    config.jobs = max(options.jobs, 1)
+    config.localeJobs = max(options.localeJobs, 1)
+
+    if options.cache:
+        config.cache = True
+
+    config.cacheSize = max(options.cacheSize, 0)
+
+    if options.gzip:
+        config.gzip = True
+
+    if options.lowMemory:
+        config.lowMemory = True
+
+    if options.hookTimings:
+        config.hookTimings = True
+
+    if options.profileBuild:
+        config.profileBuild = True
+
     return config
 
+""" Returns a configuration for every target selected in the given
+    configuration. When building multiple targets, each is built in its own
+    subdirectory of the build directory. """
+def getTargetConfigs(config):
+    if len(config.targets) == 1:
+        return [config]
+
+    targetConfigs = []
+    for target in config.targets:
+        targetConfig = copy.copy(config)
+        targetConfig.target = target
+        targetConfig.targets = [target]
+        if config.buildDir:
+            targetConfig.buildDir = config.buildDir + "/" + target
+        targetConfigs.append(targetConfig)
+    return targetConfigs
+
+""" Builds all selected targets, sharing the work that is identical for all of
+    them, like reading files and compiling stylesheets and templates. """
+def buildTargets(config):
+    # in low-memory mode, nothing is kept around for the other targets
+    memo = None if config.lowMemory else buildutil.Memo()
+    for targetConfig in getTargetConfigs(config):
+        print "Building target %s..." % targetConfig.target
+        startTime = time.time()
+        ProjectBuilder(targetConfig, memo).build()
+        print "Building target %s took %.2f seconds." % (targetConfig.target, time.time() - startTime)
+
 
 class Config:
     projectManifest = None
     target = None
+    targets = []
     serve = False
     port = 9090
     simulateHighLatency = False
     continuousBuild = False
+    daemon = False
+    socket = None
     buildDir = ""
+    jobs = 1
+    localeJobs = 1
+    cache = False
+    cacheSize = 512
+    gzip = False
+    lowMemory = False
+    hookTimings = False
+    profileBuild = False
 
 
 class ProjectBuilder(object):
-    def __init__(self, config):
-        self.shermanDir = os.path.abspath(os.path.dirname(__file__))
+
+    # modules may be built concurrently, so every worker thread tracks its own
+    # rebuild state
+    rebuildNeeded = buildutil.threadLocalProperty("rebuildNeeded", False)
+
+    def __init__(self, config, memo = None):
+        self.shermanDir = SHERMAN_DIR
         self.projectDir = os.path.dirname(config.projectManifest)
-        self.buildDir = config.buildDir or tempfile.mkdtemp(".build", "sherman.")
+        self.buildDir = os.path.abspath(config.buildDir) if config.buildDir else tempfile.mkdtemp(".build", "sherman.")
 
         self.config = config
 
@@ -96,51 +216,77 @@ class ProjectBuilder(object):
         self.target = None
         self.modules = []
 
+        self.threadState = threading.local()
         self.rebuildNeeded = False
 
         self.features = {}
+        self.hookTables = {}
+
+        # signature of the features of the target when they were first loaded
+        self.loadedFeaturesSignature = None
+
+        self.hookTimer = shermanfeature.HookTimer()
+        self.profiler = buildprofiler.BuildProfiler(config.profileBuild)
+
+        # shared with the builders of other targets built in the same process
+        self.memo = memo
+
+        self.modifiedFiles = modifiedfiles.ModifiedFiles(memo)
+        self.contentStore = contentstore.ContentStore()
+        self.pathIndex = pathindex.PathIndex(self.projectDir, self.shermanDir)
+        self.outputWriter = outputwriter.OutputWriter(self.buildDir)
+        self.buildManifest = buildmanifest.BuildManifest(self.buildDir, config.target)
+
+        # outputs of the previous build that are no longer in use are removed
+        # after this process' first build too
+        self.outputWriter.addLiveFiles(self.buildManifest.getPreviousOutputs())
+
+        self.outputCompressor = outputcompressor.OutputCompressor(self.outputWriter, self.buildDir,
+                                                                  self.projectDir + "/.sherman-cache/gzip" if config.cache else None)
+        self.moduleReleaser = None
 
-        class ModifiedFiles(object):
-            def __init__(self):
-                self.timestamps = {}
+        # set by servers that render boot pages themselves
+        self.bootPageCache = None
 
-            def read(self, locale, path):
-                path = os.path.abspath(path)
-                key = locale + ":" + path
-                mtime = os.stat(path).st_mtime
-                if key in self.timestamps and mtime == self.timestamps[key]:
-                    return False
-                self.timestamps[key] = mtime
-                with codecs.open(path, "r", "utf-8") as f:
-                    return f.read()
+        # (moduleName, artifactName) => fingerprint of the artifact's content
+        self.publishedArtifacts = {}
 
-        self.modifiedFiles = ModifiedFiles()
+        # moduleName => { (prerequisite, artifactName) => fingerprint at the time of use }
+        self.consumedArtifacts = {}
 
         class Build(object):
             # locale => {
-            #     module => {
-            #         filename => content,
-            #         "__concat__" => content,
-            #         "__manifest__" => object,
-            #         "__output__" => [ filename, ... ]
+            #     module => ModuleBuildState {
+            #         sources => { filename => content },
+            #         concat ("__concat__") => ChunkBuffer with the content,
+            #         manifest ("__manifest__") => object,
+            #         output ("__output__") => [ filename, ... ]
             #     }
             # }
             files = {}
 
         self.currentBuild = Build()
 
+        self.buildCache = buildcache.BuildCache(self, self.projectDir + "/.sherman-cache") if config.cache else None
+
         self.loadProjectManifest()
 
+    def setMemo(self, memo):
+        self.memo = memo
+        self.modifiedFiles.memo = memo
+
+    """ Returns the result of the given function, which is shared with the
+        builders of other targets if they use the same key. """
+    def memoize(self, key, compute):
+        if self.memo is None:
+            return compute()
+        return self.memo.get(key, compute)
+
     def resolveFile(self, path, directory = ""):
-        if path[0] == "/":
-            if os.path.exists(self.projectDir + path):
-                return self.projectDir + path
-            elif os.path.exists(self.shermanDir + path):
-                return self.shermanDir + path
-        else:
-            if os.path.exists(directory + "/" + path):
-                return directory + "/" + path
-        raise BuildError("Missing resource: %s" % path)
+        resolvedPath = self.pathIndex.resolve(path, directory)
+        if resolvedPath is None:
+            raise BuildError("Missing resource: %s" % path)
+        return resolvedPath
 
     def loadProjectManifest(self):
         try:
@@ -172,6 +318,8 @@ class ProjectBuilder(object):
                 raise BuildError("No modules defined in manifest file %s for target %s" % (self.config.projectManifest, self.config.target))
             self.modules = self.projectManifest["modules"]
 
+        # reset the pattern, as another target may have been built before
+        buildutil.fileNamePattern = buildutil.DEFAULT_FILE_NAME_PATTERN
         if "options" in self.target:
             if "fileNamePattern" in self.target["options"]:
                 buildutil.fileNamePattern = self.target["options"]["fileNamePattern"]
@@ -180,8 +328,14 @@ class ProjectBuilder(object):
         if not "features" in self.target:
             raise BuildError("No features defined in manifest file %s for target %s" % (self.config.projectManifest, self.config.target))
 
+        # the daemon replaces its builder instead, but other warm builders
+        # can't
+        if self.featuresChanged():
+            raise BuildError("The features of target %s changed, restart the build to apply them" % self.config.target)
+
         paths = [self.projectDir + "/features", self.shermanDir + "/features"]
 
+        numFeatures = len(self.features)
         for feature in self.target["features"]:
             featureName = feature["name"]
 
@@ -212,202 +366,466 @@ class ProjectBuilder(object):
 
             print "Enabled feature: %s" % featureName
 
-    def invokeFeatures(self, hookName, *args):
+        if len(self.hookTables) == 0 or len(self.features) != numFeatures:
+            self.compileHookTables()
+
+        if self.loadedFeaturesSignature is None:
+            self.loadedFeaturesSignature = self.getFeaturesSignature()
+
+    """ Returns a string identifying the features of the target, with their
+        options. """
+    def getFeaturesSignature(self):
+        return json.dumps(self.target.get("features"), sort_keys = True)
+
+    """ Returns whether the features of the target or their options changed
+        since the features were loaded. Loaded features are never unloaded or
+        reconfigured, so a builder for which this is true should be replaced. """
+    def featuresChanged(self):
+        return self.loadedFeaturesSignature is not None and self.loadedFeaturesSignature != self.getFeaturesSignature()
+
+    """ Builds the tables of hooks to invoke for every hook name, sorted by
+        priority. The no-op defaults of ShermanFeature are left out. """
+    def compileHookTables(self):
+        self.hookTables = {}
+        for hookName in shermanfeature.HOOK_NAMES:
+            self.hookTables[hookName] = self.compileHookTable(hookName)
+
+    def compileHookTable(self, hookName):
         hooks = []
         for featureName in self.features:
             feature = self.features[featureName]
-            if hookName in feature.__class__.__dict__:
-                function = feature.__class__.__dict__[hookName]
-            else:
-                for base in feature.__class__.__bases__:
-                    if hookName in base.__dict__:
-                        function = base.__dict__[hookName]
-                        break
+            function = getattr(feature.__class__, hookName).im_func
+            if function in shermanfeature.NOOP_HOOKS:
+                continue
             hooks.append((function.priority if "priority" in function.func_dict else shermanfeature.DEFAULT_PRIORITY,
-                          featureName, (feature, function)))
+                          featureName, feature, function, "localeNeutral" in function.func_dict))
 
-        hooks = sorted(hooks, key = lambda hook: hook[0]) 
+        return sorted(hooks, key = lambda hook: hook[0])
 
-        for hook in hooks:
-            (priority, featureName, (feature, function)) = hook
+    """ Invokes the given hook on all features. The localeNeutral keyword
+        argument can be used to invoke only the hooks that are declared
+        locale-neutral (True), or only the ones that are not (False). """
+    def invokeFeatures(self, hookName, *args, **kwargs):
+        localeNeutral = kwargs.get("localeNeutral")
+
+        if not hookName in self.hookTables:
+            self.hookTables[hookName] = self.compileHookTable(hookName)
+
+        for (priority, featureName, feature, function, neutral) in self.hookTables[hookName]:
+            if localeNeutral is not None and localeNeutral != neutral:
+                continue
+            if not featureName in self.features:
+                continue # temporarily disabled, like inline while generating the JSON index
+
+            startTime = time.time()
             try:
-                function(feature, *args)
+                with self.profiler.phase(hookName, featureName = featureName):
+                    function(feature, *args)
             except Exception, exception:
                 raise BuildError("Exception in feature %s" % featureName, exception)
+            finally:
+                self.hookTimer.record(hookName, featureName, time.time() - startTime)
 
     def serve(self):
-        if os.path.exists(self.projectDir + "/cgi-bin"):
-            shutil.copytree(self.projectDir + "/cgi-bin", self.buildDir + "/cgi-bin")
-        else:
-            shutil.copytree(self.shermanDir + "/cgi-bin", self.buildDir + "/cgi-bin")
-        os.system("chmod -R a+rwx " + self.buildDir)
-
-        # set working directory as the CGIHTTPServer will only serve from current dir
-        os.chdir(self.buildDir)
-
-        random.seed()
-
-        import BaseHTTPServer
-        import CGIHTTPServer
-
-        builder = self
-        class ProjectServerRequestHandler(CGIHTTPServer.CGIHTTPRequestHandler):
-
-            def do_GET(self):
-                try:
-                    search = ""
-                    path = self.path
-                    qi = path.find("?")
-                    if qi > -1:
-                        search = path[qi:]
-                        path = path[0:qi]
-
-                    if path == "/":
-                        self.path = "/cgi-bin/index.py" + search
-                        builder.loadProjectManifest()
-                        shutil.copy(builder.config.projectManifest, builder.buildDir)
-                        builder.build()
-
-                    if path.startswith("/") and path.endswith(".js"):
-                        moduleName = path[1:-3]
-                        if moduleName == "boot":
-                            builder.loadProjectManifest()
-                            shutil.copy(builder.config.projectManifest, builder.buildDir)
-                            builder.build()
-                        localeFiles = builder.currentBuild.files[builder.projectManifest["defaultLocale"]]
-                        if moduleName in localeFiles:
-                            module = localeFiles[moduleName]
-                            for fileName in module["__output__"]:
-                                if fileName.endswith(".js"):
-                                    with open(builder.buildDir + "/" + fileName, "r") as f:
-                                        self.wfile.write(f.read())
-                                        return
-                            raise BuildError("Module %s did not generate a JavaScript output file" % moduleName)
-
-                    if builder.config.simulateHighLatency:
-                        time.sleep(0.2 + 2 * random.random())
-                    CGIHTTPServer.CGIHTTPRequestHandler.do_GET(self)
-                except BuildError, error:
-                    error.printMessage()
-
-                    self.wfile.write("<html>")
-                    self.wfile.write("<body>")
-                    self.wfile.write("<h1>Build Error</h1>")
-                    self.wfile.write("<pre>%s</pre>" % str(error))
-                    self.wfile.write("<p>(check console output for more info)</p>")
-                    self.wfile.write("</body>")
-                    self.wfile.write("</html>")
-
-            def do_POST(self):
-                if self.path == "/profile-dump":
-                    length = int(self.headers.getheader("content-length"))
-                    builder.features["profiling"].showProfileDump(self.rfile.read(length))
-                else:
-                    CGIHTTPServer.CGIHTTPRequestHandler.do_POST(self)
-
-        print "Serving at http://localhost:%i/" % self.config.port
-        httpd = BaseHTTPServer.HTTPServer(("0.0.0.0", self.config.port), ProjectServerRequestHandler)
-        httpd.allow_reuse_address = True
-        httpd.serve_forever()
+        devserver.DevServer(self).serve()
+
+    """ Returns a watcher for changes to the files used by the build. """
+    def createWatcher(self):
+        projectDir = os.path.abspath(self.projectDir)
+        return filewatcher.createWatcher(
+            [projectDir + "/modules", projectDir + "/boot", projectDir + "/features",
+             self.shermanDir + "/modules", self.shermanDir + "/features"],
+            set([self.buildDir, projectDir + "/.sherman-cache"]),
+            [projectDir]
+        )
+
+    """ Returns the changed paths reported by a watcher that affect the
+        build. """
+    def filterChangedPaths(self, paths):
+        projectDir = os.path.abspath(self.projectDir)
+        projectManifest = os.path.abspath(self.config.projectManifest)
+
+        # only the project manifest matters from the project's main directory
+        return set(path for path in paths
+                   if not os.path.basename(path).startswith(".") and not path.endswith(".pyc") and
+                      (os.path.dirname(path) != projectDir or path == projectManifest))
 
     def continuousBuild(self):
-        while True:
-            self.build()
-            time.sleep(1)
+        # start watching before the first build, so no change goes unnoticed
+        watcher = self.createWatcher()
+        print "Watching for changes using %s..." % watcher.name
 
-    def build(self):
-        if not os.path.exists(self.buildDir):
-            distutils.dir_util.mkpath(self.buildDir)
+        moduleNames = None
+        while True:
+            startTime = time.time()
+            try:
+                if moduleNames is None:
+                    self.loadProjectManifest()
+                self.build(moduleNames)
+                succeeded = True
+            except BuildError, error:
+                error.printMessage()
+                succeeded = False
+            print "Build took %.2f seconds." % (time.time() - startTime)
+
+            while True:
+                paths = watcher.waitForChanges()
+                if paths is not None:
+                    paths = self.filterChangedPaths(paths)
+
+                # after a failed build, not all modules may have been built
+                moduleNames = self.getAffectedModules(paths) if succeeded else None
+                if moduleNames is None or len(moduleNames) > 0:
+                    break
+
+            if moduleNames is None:
+                print "Detected changes, rebuilding all modules..."
+            else:
+                print "Detected changes, rebuilding modules: %s" % ", ".join(sorted(moduleNames))
+
+    """ Returns the names of the modules affected by changes to the given paths,
+        including all the modules that depend on them, or None if all modules
+        should be rebuilt, as is the case when a path doesn't belong to any
+        module, like the boot HTML template. """
+    def getAffectedModules(self, paths):
+        if paths is None or os.path.abspath(self.config.projectManifest) in paths:
+            return None
+
+        affectedModules = set()
+        unclaimedPaths = set(paths)
+        prerequisites = {}
+        for module in self.modules:
+            moduleName = module["name"]
+            if not "__manifest__" in self.currentBuild.files["*"][moduleName]:
+                return None
+
+            modulePath = os.path.abspath(self.findModulePath(moduleName))
+            externalPaths = self.getExternalPaths(moduleName)
+
+            for path in paths:
+                if path.startswith(modulePath + "/") or path in externalPaths:
+                    affectedModules.add(moduleName)
+                    unclaimedPaths.discard(path)
+
+            prerequisites[moduleName] = self.currentBuild.files["*"][moduleName]["__manifest__"]["dependencies"]
+            if moduleName != "boot":
+                prerequisites[moduleName] = prerequisites[moduleName] + ["boot"]
+
+        if unclaimedPaths:
+            return None
+
+        numAffectedModules = -1
+        while numAffectedModules != len(affectedModules):
+            numAffectedModules = len(affectedModules)
+            for moduleName in prerequisites:
+                for prerequisite in prerequisites[moduleName]:
+                    if prerequisite in affectedModules:
+                        affectedModules.add(moduleName)
+
+        return affectedModules
+
+    """ Returns the paths of the resources a module uses from outside its own
+        directory, which are the paths starting with a slash. """
+    def getExternalResources(self, moduleName):
+        manifest = self.currentBuild.files["*"][moduleName]["__manifest__"]
+
+        resources = []
+        for key in ["sources", "styles", "statics"]:
+            if key in manifest:
+                resources += manifest[key]
+        if moduleName == "boot":
+            for featureName in self.features:
+                resources += self.features[featureName].additionalBootResources
+
+        return sorted(set(resource["path"] for resource in resources if resource["path"].startswith("/")))
+
+    """ Returns the absolute paths of the external resources of a module that
+        exist. """
+    def getExternalPaths(self, moduleName):
+        externalPaths = set()
+        for path in self.getExternalResources(moduleName):
+            try:
+                externalPaths.add(os.path.abspath(self.resolveFile(path)))
+            except BuildError:
+                pass # a missing resource will be reported by the build
+        return externalPaths
+
+    """ Returns whether the build directory still holds all outputs of the
+        last successful build, which a warm builder assumes to be there. """
+    def hasOutputs(self):
+        return os.path.isdir(self.buildDir) and self.outputWriter.hasLiveFiles()
+
+    """ Builds the project. If a list of module names is given, only those
+        modules are rebuilt, while the other modules keep their current
+        state. """
+    def build(self, moduleNames = None):
+        buildStartTime = time.time()
+
+        # not distutils' mkpath(), which remembers the directories it created
+        # even after they are removed
+        if not os.path.isdir(self.buildDir):
+            os.makedirs(self.buildDir)
 
         self.loadFeatures()
+        self.pathIndex.refresh()
+        self.outputWriter.reset()
+        self.hookTimer.reset()
+        self.profiler.reset()
 
-        for locale in self.locales:
+        # the "*" locale holds the locale-neutral state of every module
+        for locale in ["*"] + self.locales:
             if not locale in self.currentBuild.files:
                 self.currentBuild.files[locale] = {}
             for module in self.modules:
                 moduleName = module["name"]
                 if not moduleName in self.currentBuild.files[locale]:
-                    self.currentBuild.files[locale][moduleName] = {}
-                self.currentBuild.files[locale][moduleName]["__built__"] = False
+                    self.currentBuild.files[locale][moduleName] = modulestate.ModuleBuildState()
+                skipped = moduleNames is not None and not moduleName in moduleNames
+                self.currentBuild.files[locale][moduleName].built = skipped
 
-        for module in self.modules:
-            self.buildModule(module["name"])
+        if self.config.lowMemory:
+            self.moduleReleaser = modulereleaser.ModuleReleaser(self)
+            self.moduleReleaser.start()
+
+        if self.config.jobs > 1:
+            scheduler = buildscheduler.ModuleScheduler(self, self.config.jobs)
+            scheduler.buildModules([module["name"] for module in self.modules])
+        else:
+            for module in self.modules:
+                self.buildModule(module["name"])
+
+        # modules built from here on, like the full boot module of json-index,
+        # are not released
+        self.moduleReleaser = None
 
         self.invokeFeatures("modulesWritten")
 
         if os.path.exists(self.projectDir + "/boot"):
             for locale in self.locales:
-                bootHash = self.writeBootHtml(locale)
-    
+                with self.profiler.phase("writeBootHtml", locale = locale):
+                    bootHash = self.writeBootHtml(locale)
+
                 self.writeVersionFile("__version__", locale, bootHash)
 
         self.invokeFeatures("buildFinished")
 
+        outputFiles = dict((fileName, (None, locale)) for (fileName, locale)
+                           in self.outputWriter.getCurrentFiles().items())
+        outputFiles.update(self.getOutputFiles())
+
+        if self.config.gzip:
+            with self.profiler.phase("compressOutputFiles"):
+                outputFiles.update(self.outputCompressor.compressFiles(outputFiles))
+
+        diff = self.buildManifest.write(self.outputWriter, outputFiles)
+        print "Wrote %s: %d files added, %d changed, %d removed." % (self.buildManifest.fileName, len(diff["added"]),
+                                                                   len(diff["changed"]), len(diff["removed"]))
+
+        numRemoved = self.outputWriter.collectGarbage(outputFiles)
+        if numRemoved > 0:
+            print "Removed %d stale output files." % numRemoved
+
+        self.contentStore.purge(module for modules in self.currentBuild.files.values() for module in modules.values())
+
+        if self.buildCache:
+            (numPruned, prunedSize) = self.buildCache.prune(self.config.cacheSize * 1024 * 1024, buildStartTime)
+            if numPruned > 0:
+                print "Removed %d least recently used cache entries (%.1f MB)." % (numPruned, prunedSize / 1048576.0)
+
         print "Done."
 
+        if self.config.lowMemory:
+            self.printPeakMemoryUsage()
+
+        if self.config.hookTimings:
+            self.hookTimer.printTimings()
+
+        if self.config.profileBuild:
+            self.profiler.writeReports(self.projectDir + "/build-profile.json", self.projectDir + "/build-profile.trace.json")
+
     def buildModule(self, moduleName):
         defaultLocale = self.projectManifest["defaultLocale"]
 
-        if self.currentBuild.files[defaultLocale][moduleName]["__built__"]:
+        module = self.currentBuild.files[defaultLocale][moduleName]
+        if module.built:
             return # module already built
 
-        self.currentBuild.files[defaultLocale][moduleName]["__built__"] = True
+        module.built = True
 
-        if os.path.exists(self.projectDir + "/modules/" + moduleName):
-            modulePath = self.projectDir + "/modules/" + moduleName
-        elif os.path.exists(self.shermanDir + "/modules/" + moduleName):
-            modulePath = self.shermanDir + "/modules/" + moduleName
-        else:
-            raise BuildError("Could not find module %s" % moduleName)
+        modulePath = self.findModulePath(moduleName)
 
         self.loadModuleManifest(moduleName, modulePath)
 
         # make sure dependencies are built before the module itself
-        for prerequisite in self.currentBuild.files[defaultLocale][moduleName]["__manifest__"]["dependencies"]:
+        for prerequisite in module.manifest["dependencies"]:
             self.buildModule(prerequisite)
 
         print "Building module %s..." % moduleName
 
+        with self.profiler.phase("buildModule", moduleName):
+            self.processModule(moduleName, modulePath)
+
+        if self.moduleReleaser:
+            self.moduleReleaser.moduleBuilt(moduleName)
+
+    def processModule(self, moduleName, modulePath):
+        if self.buildCache:
+            with self.profiler.phase("restoreFromCache"):
+                if self.buildCache.restoreModule(moduleName, modulePath):
+                    return
+
+        changedArtifacts = self.getChangedArtifacts(moduleName)
+        if len(changedArtifacts) > 0:
+            print "  Rebuilding, because of changes to %s..." % ", ".join("%s of module %s" % (artifactName, prerequisite)
+                                                                       for (prerequisite, artifactName) in changedArtifacts)
+            self.invalidateModule(moduleName, modulePath)
+
+        # changes to the manifest itself affect the whole module as well
+        self.dependOnArtifact(moduleName, moduleName, "__manifest__")
+
         defaultLocale = self.projectManifest["defaultLocale"]
         manifest = self.currentBuild.files[defaultLocale][moduleName]["__manifest__"]
         self.invokeFeatures("manifestLoaded", moduleName, modulePath, manifest)
 
-        for locale in self.locales:
-            print "  Processing locale %s..." % locale
+        with self.profiler.phase("loadSources", locale = "*"):
+            self.loadNeutralSources(moduleName, modulePath)
 
+        if self.config.localeJobs > 1 and len(self.locales) > 1:
+            localepool.buildLocales(self, moduleName, modulePath, self.config.localeJobs)
+        else:
+            for locale in self.locales:
+                self.buildLocale(locale, moduleName, modulePath)
+
+        if self.buildCache:
+            with self.profiler.phase("storeInCache"):
+                self.buildCache.storeModule(moduleName, modulePath)
+
+    def buildLocale(self, locale, moduleName, modulePath):
+        print "  Processing locale %s..." % locale
+
+        with self.profiler.phase("loadSources", moduleName, locale):
             self.loadSources(locale, moduleName, modulePath)
 
-            if self.isRebuildNeeded(locale, moduleName, modulePath):
-                self.removeOldFiles(locale, moduleName, modulePath)
+        if self.isRebuildNeeded(locale, moduleName, modulePath):
+            self.resetOutputFiles(locale, moduleName, modulePath)
 
+            with self.profiler.phase("concatenateSources", moduleName, locale):
                 self.concatenateSources(locale, moduleName, modulePath)
 
+            with self.profiler.phase("writeFiles", moduleName, locale):
                 self.writeFiles(locale, moduleName, modulePath)
 
-    def loadModuleManifest(self, moduleName, modulePath):
-        try:
-            contents = self.modifiedFiles.read("*", modulePath + "/manifest.json")
-            if contents:
-                manifest = json.loads(contents)
-                for locale in self.locales:
-                    self.currentBuild.files[locale][moduleName]["__manifest__"] = manifest
-
-                if not "dependencies" in manifest:
-                    raise BuildError("No dependencies specified for module %s" % moduleName)
-        except Exception, exception:
-            raise BuildError("Could not load manifest for module %s" % moduleName, exception)
+    def exportLocaleState(self, locale, moduleName):
+        module = self.currentBuild.files[locale][moduleName]
+        prefix = locale + ":"
 
-    def loadSources(self, locale, moduleName, modulePath):
+        featureStates = {}
+        for featureName in self.features:
+            try:
+                featureStates[featureName] = self.features[featureName].exportLocaleState(locale, moduleName)
+            except Exception, exception:
+                raise BuildError("Exception in feature %s" % featureName, exception)
+
+        return {
+            "module": dict((key, module[key]) for key in module if key != "__manifest__"),
+            "readHashes": dict((key, contentHash) for (key, contentHash) in self.modifiedFiles.readHashes.items()
+                               if key.startswith(prefix)),
+            "features": featureStates
+        }
+
+    def importLocaleState(self, locale, moduleName, state):
         module = self.currentBuild.files[locale][moduleName]
 
+        # the manifest is shared between locales, so keep our own instance
+        manifest = module["__manifest__"]
+        module.clear()
+        module.update(state["module"])
+        module["__manifest__"] = manifest
+        self.contentStore.internModule(module)
+
+        self.modifiedFiles.readHashes.update(state["readHashes"])
+
+        for featureName in state["features"]:
+            try:
+                self.features[featureName].importLocaleState(locale, moduleName, state["features"][featureName])
+            except Exception, exception:
+                raise BuildError("Exception in feature %s" % featureName, exception)
+
+    """ Records the fingerprint of an artifact a module provides to the modules
+        depending on it, like its translations. Modules that used a different
+        version of the artifact are rebuilt. """
+    def publishArtifact(self, moduleName, artifactName, fingerprint):
+        self.publishedArtifacts[(moduleName, artifactName)] = fingerprint
+
+    """ Declares that the output of a module depends on an artifact of one of
+        its prerequisites, as it is now. Returns the artifact's fingerprint. """
+    def dependOnArtifact(self, moduleName, prerequisite, artifactName):
+        fingerprint = self.publishedArtifacts.get((prerequisite, artifactName))
+        if not moduleName in self.consumedArtifacts:
+            self.consumedArtifacts[moduleName] = {}
+        self.consumedArtifacts[moduleName][(prerequisite, artifactName)] = fingerprint
+        return fingerprint
+
+    """ Returns the artifacts of prerequisites, as tuples (prerequisite,
+        artifactName), which changed since the module used them. """
+    def getChangedArtifacts(self, moduleName):
+        changedArtifacts = []
+        for (key, fingerprint) in sorted(self.consumedArtifacts.get(moduleName, {}).items()):
+            if self.publishedArtifacts.get(key) != fingerprint:
+                changedArtifacts.append(key)
+        return changedArtifacts
+
+    """ Makes sure the module is rebuilt completely, by considering all files
+        it read (except its manifest) to be modified. """
+    def invalidateModule(self, moduleName, modulePath):
+        modulePath = os.path.abspath(modulePath)
+        manifestPath = modulePath + "/manifest.json"
+
+        externalPaths = self.getExternalPaths(moduleName)
+        self.modifiedFiles.forget(lambda path: (path.startswith(modulePath + "/") and path != manifestPath) or
+                                               path in externalPaths)
+
+        # the features will declare their dependencies again
+        self.consumedArtifacts.pop(moduleName, None)
+
+    def findModulePath(self, moduleName):
+        if os.path.exists(self.projectDir + "/modules/" + moduleName):
+            return self.projectDir + "/modules/" + moduleName
+        elif os.path.exists(self.shermanDir + "/modules/" + moduleName):
+            return self.shermanDir + "/modules/" + moduleName
+        else:
+            raise BuildError("Could not find module %s" % moduleName)
+
+    def loadModuleManifest(self, moduleName, modulePath):
+        with self.profiler.phase("loadManifest", moduleName):
+            try:
+                contents = self.modifiedFiles.read("*", modulePath + "/manifest.json")
+                if contents:
+                    manifest = json.loads(contents)
+                    self.publishArtifact(moduleName, "__manifest__", buildutil.getContentHash(contents))
+                    for locale in ["*"] + self.locales:
+                        self.currentBuild.files[locale][moduleName]["__manifest__"] = manifest
+
+                    if not "dependencies" in manifest:
+                        raise BuildError("No dependencies specified for module %s" % moduleName)
+
+                    self.pathIndex.indexManifest(manifest, modulePath)
+            except Exception, exception:
+                raise BuildError("Could not load manifest for module %s" % moduleName, exception)
+
+    def loadNeutralSources(self, moduleName, modulePath):
+        print "  Processing locale-neutral sources..."
+
+        module = self.currentBuild.files["*"][moduleName]
+
         try:
             self.rebuildNeeded = False
 
-            for source in module["__manifest__"]["sources"]:
+            for source in module.manifest["sources"]:
                 path = self.resolveFile(source["path"], modulePath + "/js")
-                contents = self.modifiedFiles.read(locale, path)
+                contents = self.modifiedFiles.read("*", path)
                 if contents:
-                    module[path] = contents
+                    module.sources[path] = contents
                     self.rebuildNeeded = True
         except Exception, exception:
             raise BuildError("Could not load sources for module %s" % moduleName, exception)
@@ -415,7 +833,26 @@ class ProjectBuilder(object):
         if self.rebuildNeeded:
             print "    Loaded JavaScript..."
 
-        self.invokeFeatures("sourcesLoaded", locale, moduleName, modulePath)
+        self.invokeFeatures("sourcesLoaded", "*", moduleName, modulePath, localeNeutral = True)
+
+        # the locales share the locale-neutral content
+        self.contentStore.internModule(module)
+
+        # remember whether anything changed, as locale-specific hooks may reset
+        # the flags of the features
+        self.rebuildNeeded = self.isRebuildNeeded("*", moduleName, modulePath)
+
+    def loadSources(self, locale, moduleName, modulePath):
+        module = self.currentBuild.files[locale][moduleName]
+        neutralModule = self.currentBuild.files["*"][moduleName]
+
+        # locales share the locale-neutral content, until a feature replaces it
+        if self.rebuildNeeded or any(not key in module for key in neutralModule):
+            for key in neutralModule:
+                if not key in ("__manifest__", "__built__", "__output__"):
+                    module[key] = neutralModule[key]
+
+        self.invokeFeatures("sourcesLoaded", locale, moduleName, modulePath, localeNeutral = False)
 
     def isRebuildNeeded(self, locale, moduleName, modulePath):
         if self.rebuildNeeded:
@@ -430,14 +867,36 @@ class ProjectBuilder(object):
 
         return False
 
-    def removeOldFiles(self, locale, moduleName, modulePath):
+    """ Forgets the output files of a module before rebuilding it. The files
+        themselves are removed only after the build succeeded, if they are not
+        written again. """
+    def resetOutputFiles(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
-        if "__output__" in module:
-            for filename in module["__output__"]:
-                os.unlink(self.buildDir + "/" + filename)
-
-        module["__output__"] = []
+        module.output = []
+
+    """ Returns the output files of all modules in all locales, mapped to
+        tuples (moduleName, locale). The locale is None for files shared by
+        multiple locales, like statics. """
+    def getOutputFiles(self):
+        outputFiles = {}
+        for locale in self.currentBuild.files:
+            modules = self.currentBuild.files[locale]
+
+            # features may add modules of their own, like the full boot module
+            # of json-index, but files of project modules are attributed to them
+            moduleNames = [module["name"] for module in self.modules if module["name"] in modules]
+            moduleNames += sorted(moduleName for moduleName in modules if not moduleName in moduleNames)
+
+            for moduleName in moduleNames:
+                module = modules[moduleName]
+                fileNames = module.get("__output__", []) + module.get("__staticMap__", {}).values()
+                for fileName in fileNames:
+                    if not fileName in outputFiles:
+                        outputFiles[fileName] = (moduleName, locale if locale != "*" else None)
+                    elif outputFiles[fileName][0] == moduleName and outputFiles[fileName][1] != locale:
+                        outputFiles[fileName] = (moduleName, None)
+        return outputFiles
 
     def concatenateSources(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
@@ -445,14 +904,14 @@ class ProjectBuilder(object):
         try:
             print "    Concatenating sources..."
 
-            concat = ""
-            for source in module["__manifest__"]["sources"]:
+            concat = buildutil.ChunkBuffer()
+            for source in module.manifest["sources"]:
                 path = self.resolveFile(source["path"], modulePath + "/js")
-                content = module[path].strip()
+                content = module.sources[path].strip()
                 if len(content) > 0:
                     content += ("\n" if content[-1] == ";" else ";\n")
-                concat += content
-            module["__concat__"] = concat
+                concat.append(self.contentStore.intern(content))
+            module.concat = concat
         except Exception, exception:
             raise BuildError("Could not concatenate sources for module %s" % moduleName, exception)
 
@@ -464,11 +923,13 @@ class ProjectBuilder(object):
         module = self.currentBuild.files[locale][moduleName]
 
         try:
-            contents = module["__concat__"]
+            contents = module.concat
             filename = buildutil.getDestinationFileName(moduleName, None, contents, locale, "js")
-            with codecs.open(self.buildDir + "/" + filename, "w", "utf-8") as f:
-                f.write(contents)
-            module["__output__"].append(filename)
+            self.outputWriter.writeFile(filename, contents, buildutil.isContentAddressed(contents))
+            module.output.append(filename)
+
+            # most of the content is the same for all locales
+            self.contentStore.internModule(module)
         except Exception, exception:
             raise BuildError("Could not write output file for module %s" % moduleName, exception)
 
@@ -512,15 +973,34 @@ class ProjectBuilder(object):
             }
 
         filename = buildutil.getDestinationFileName("boot", None, bootHtml, locale, "html")
-        with codecs.open(self.buildDir + "/" + filename, "w", "utf-8") as f:
-            f.write(bootHtml)
+        self.outputWriter.writeFile(filename, bootHtml, buildutil.isContentAddressed(bootHtml), locale)
 
-        return buildutil.getContentHash(bootHtml)
+        bootHash = buildutil.getContentHash(bootHtml)
+        if self.bootPageCache:
+            self.bootPageCache.addBootHtml(locale, bootHash, bootHtml)
+        return bootHash
 
     def writeVersionFile(self, name, locale, hash):
         filename = buildutil.getDestinationFileName(name, None, None, locale, "md5")
-        with open(self.buildDir + "/" + filename, "w") as f:
-            f.write(hash)
+        self.outputWriter.writeFile(filename, hash, locale = locale)
+
+        if self.bootPageCache and name == "__version__":
+            self.bootPageCache.setVersion(locale, hash)
+
+    def printPeakMemoryUsage(self):
+        # not available on Windows
+        if not resource:
+            return
+
+        # Linux reports kilobytes, Mac OS X bytes
+        unit = 1 if sys.platform == "darwin" else 1024
+
+        peakUsage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+        print "Peak memory usage: %.1f MB" % (peakUsage / 1048576.0)
+
+        childUsage = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+        if childUsage > 0:
+            print "Peak memory usage of child processes: %.1f MB" % (childUsage / 1048576.0)
 
 
 if __name__ == "__main__":
@@ -529,6 +1009,14 @@ if __name__ == "__main__":
     config = parseOptions()
 
     try:
+        if config.daemon:
+            builddaemon.BuildDaemon(config, parseOptions, getTargetConfigs, ProjectBuilder).serve()
+            exit()
+
+        if len(config.targets) > 1:
+            buildTargets(config)
+            exit()
+
         builder = ProjectBuilder(config)
 
         if config.serve:
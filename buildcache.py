@@ -0,0 +1,260 @@
+from __future__ import with_statement
+from builderror import BuildError
+
+import buildutil
+import cPickle
+import hashlib
+import os
+import sys
+import tempfile
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+# bump whenever the format of cache entries or the build pipeline changes
+CACHE_VERSION = "3"
+
+
+""" Sets the modification time of a file to now, which the cache uses as the
+    time the file was last used, as access times are not reliably updated. """
+def touchFile(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+class BuildCache(object):
+
+    def __init__(self, projectBuilder, cacheDir):
+        self.projectBuilder = projectBuilder
+        self.cacheDir = cacheDir
+
+        self.moduleKeys = {}
+        self.featureKeys = {}
+
+        for directory in [self.cacheDir + "/modules", self.cacheDir + "/files"]:
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+    """ Returns the key under which the module is cached. The key covers the
+        contents of all files in the module's directory, any resources the
+        module uses from outside that directory, the enabled features and
+        their options, the target, and the keys of all prerequisites. """
+    def getModuleKey(self, moduleName, modulePath):
+        builder = self.projectBuilder
+        manifest = builder.currentBuild.files["*"][moduleName]["__manifest__"]
+
+        m = hashlib.md5()
+        m.update(CACHE_VERSION)
+        m.update(json.dumps([builder.config.target, builder.locales, buildutil.fileNamePattern]))
+
+        m.update(self.getFeaturesKey())
+
+        for (directory, dirNames, fileNames) in os.walk(modulePath):
+            dirNames[:] = sorted(dirName for dirName in dirNames if not dirName.startswith("."))
+            for fileName in sorted(fileNames):
+                if not fileName.startswith("."):
+                    path = os.path.join(directory, fileName)
+                    m.update(os.path.relpath(path, modulePath) + builder.modifiedFiles.getContentHash(path))
+
+        for path in builder.getExternalResources(moduleName):
+            m.update(path + builder.modifiedFiles.getContentHash(builder.resolveFile(path)))
+
+        for prerequisite in self.getPrerequisites(moduleName, manifest):
+            if not prerequisite in self.moduleKeys:
+                raise BuildError("Module %s was not built before its dependent %s" % (prerequisite, moduleName))
+            m.update(self.moduleKeys[prerequisite])
+
+        return m.hexdigest()
+
+    def getFeaturesKey(self):
+        features = self.projectBuilder.features
+        featureNames = sorted(features)
+
+        # the options of the features are part of the key, as a builder may be
+        # reused with another configuration
+        memoKey = json.dumps([(featureName, features[featureName].options) for featureName in featureNames],
+                             sort_keys = True)
+        if memoKey in self.featureKeys:
+            return self.featureKeys[memoKey]
+
+        m = hashlib.md5()
+        for featureName in featureNames:
+            feature = features[featureName]
+            m.update(json.dumps([featureName, feature.options], sort_keys = True))
+            featureDir = os.path.dirname(sys.modules[feature.__class__.__module__].__file__)
+            for entry in buildutil.dirEntries(featureDir):
+                if os.path.isfile(featureDir + "/" + entry) and not entry.endswith(".pyc"):
+                    m.update(entry + self.projectBuilder.modifiedFiles.getContentHash(featureDir + "/" + entry))
+
+        self.featureKeys[memoKey] = m.hexdigest()
+        return self.featureKeys[memoKey]
+
+    def getPrerequisites(self, moduleName, manifest):
+        prerequisites = list(manifest["dependencies"])
+
+        # namespace and modules use the manifest of the boot module
+        if moduleName != "boot" and "boot" in self.moduleKeys and not "boot" in prerequisites:
+            prerequisites.append("boot")
+
+        return prerequisites
+
+    def hashFile(self, path):
+        m = hashlib.md5()
+        with open(path, "rb") as f:
+            m.update(f.read())
+        return m.hexdigest()
+
+    """ Restores a module from the cache, including its output files. Returns
+        False if the module is not in the cache. """
+    def restoreModule(self, moduleName, modulePath):
+        builder = self.projectBuilder
+
+        key = self.getModuleKey(moduleName, modulePath)
+        self.moduleKeys[moduleName] = key
+
+        entryPath = "%s/modules/%s.pickle" % (self.cacheDir, key)
+        if not os.path.exists(entryPath):
+            return False
+
+        try:
+            with open(entryPath, "rb") as f:
+                entry = cPickle.load(f)
+        except Exception, exception:
+            print "  Ignoring unreadable build cache entry for module %s: %s" % (moduleName, exception)
+            return False
+
+        for (fileName, contentHash) in entry["files"].items():
+            if not os.path.exists("%s/files/%s" % (self.cacheDir, contentHash)):
+                return False
+
+        # mark the entry as recently used, so it's the last to be pruned
+        touchFile(entryPath)
+        for (fileName, contentHash) in entry["files"].items():
+            touchFile("%s/files/%s" % (self.cacheDir, contentHash))
+            builder.outputWriter.copyFile("%s/files/%s" % (self.cacheDir, contentHash), fileName)
+
+        manifest = entry["manifest"]
+        for locale in entry["modules"]:
+            module = builder.currentBuild.files[locale][moduleName]
+            module.clear()
+            module.update(entry["modules"][locale])
+            module["__manifest__"] = manifest
+            builder.contentStore.internModule(module)
+
+        for (artifactName, fingerprint) in entry["artifacts"]["published"].items():
+            builder.publishArtifact(moduleName, artifactName, fingerprint)
+        builder.consumedArtifacts[moduleName] = dict(entry["artifacts"]["consumed"])
+
+        for locale in entry["features"]:
+            for (featureName, state) in entry["features"][locale].items():
+                try:
+                    builder.features[featureName].importLocaleState(locale, moduleName, state)
+                except Exception, exception:
+                    raise BuildError("Exception in feature %s" % featureName, exception)
+
+        print "  Restored from build cache."
+        return True
+
+    """ Stores a freshly built module in the cache. Modules whose state cannot
+        be stored are skipped with a warning, as the cache is merely an
+        optimization. """
+    def storeModule(self, moduleName, modulePath):
+        builder = self.projectBuilder
+        currentBuild = builder.currentBuild
+
+        entry = {
+            "manifest": currentBuild.files["*"][moduleName]["__manifest__"],
+            "modules": {},
+            "features": {},
+            "files": {},
+            "artifacts": {
+                "published": dict((artifactName, fingerprint) for ((name, artifactName), fingerprint)
+                                  in builder.publishedArtifacts.items() if name == moduleName),
+                "consumed": builder.consumedArtifacts.get(moduleName, {})
+            }
+        }
+
+        for locale in ["*"] + builder.locales:
+            module = currentBuild.files[locale][moduleName]
+            entry["modules"][locale] = dict((key, module[key]) for key in module if key != "__manifest__")
+
+            if locale == "*":
+                continue
+
+            entry["features"][locale] = {}
+            for featureName in builder.features:
+                try:
+                    entry["features"][locale][featureName] = builder.features[featureName].exportLocaleState(locale, moduleName)
+                except Exception, exception:
+                    raise BuildError("Exception in feature %s" % featureName, exception)
+
+            fileNames = list(module.get("__output__", []))
+            if "__staticMap__" in module:
+                fileNames += module["__staticMap__"].values()
+            for fileName in fileNames:
+                entry["files"][fileName] = self.storeFile(builder.buildDir + "/" + fileName)
+
+        try:
+            self.writeAtomically("%s/modules/%s.pickle" % (self.cacheDir, self.moduleKeys[moduleName]),
+                                 cPickle.dumps(entry, cPickle.HIGHEST_PROTOCOL))
+        except Exception, exception:
+            print "  Could not store module %s in the build cache: %s" % (moduleName, exception)
+
+    def storeFile(self, path):
+        contentHash = self.hashFile(path)
+        blobPath = "%s/files/%s" % (self.cacheDir, contentHash)
+        if os.path.exists(blobPath):
+            touchFile(blobPath)
+        else:
+            with open(path, "rb") as f:
+                self.writeAtomically(blobPath, f.read())
+        return contentHash
+
+    """ Removes the least recently used files from the cache directory, including
+        those of other caches in it, until its total size is at most maxSize
+        bytes. Files used since keepSince, a timestamp, are kept regardless.
+        Module entries whose files were removed are simply rebuilt. Returns a
+        tuple (number of files removed, bytes removed). """
+    def prune(self, maxSize, keepSince):
+        files = []
+        totalSize = 0
+        for (directory, dirNames, fileNames) in os.walk(self.cacheDir):
+            for fileName in fileNames:
+                if fileName.endswith(".tmp"):
+                    continue # being written
+
+                path = os.path.join(directory, fileName)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                totalSize += stat.st_size
+
+        numRemoved = 0
+        removedSize = 0
+        for (mtime, size, path) in sorted(files):
+            if totalSize - removedSize <= maxSize or mtime >= int(keepSince):
+                break
+            try:
+                os.unlink(path)
+                numRemoved += 1
+                removedSize += size
+            except OSError:
+                pass
+        return (numRemoved, removedSize)
+
+    def writeAtomically(self, path, content):
+        (fd, tempPath) = tempfile.mkstemp(".tmp", "", os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.rename(tempPath, path)
+        except:
+            os.unlink(tempPath)
+            raise
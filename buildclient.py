@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+from __future__ import with_statement
+
+import build
+import builddaemon
+import os
+import socket
+import sys
+
+
+""" Asks the build daemon for the project to run a build, with the same
+    command line arguments as build.py. The output of the build is printed as
+    it comes in, and the exit status of the build is returned. If no daemon is
+    running, build.py is run in-process instead. """
+def main(args):
+    config = build.parseOptions(args)
+    socketPath = builddaemon.getSocketPath(config)
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socketPath)
+    except socket.error:
+        print "No build daemon listening on %s, building in-process..." % socketPath
+        sys.stdout.flush()
+        buildScript = os.path.dirname(os.path.abspath(__file__)) + "/build.py"
+        os.execv(sys.executable, [sys.executable, buildScript] + args)
+
+    try:
+        builddaemon.sendMessage(connection, { "args": args, "cwd": os.getcwd() })
+
+        for message in builddaemon.receiveMessages(connection):
+            if "output" in message:
+                sys.stdout.write(message["output"].encode("utf-8"))
+                sys.stdout.flush()
+            elif "exitStatus" in message:
+                return message["exitStatus"]
+    finally:
+        connection.close()
+
+    print "Lost connection to the build daemon"
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print "\nExit."
+        exit(1)
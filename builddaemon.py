@@ -0,0 +1,226 @@
+from __future__ import with_statement
+from builderror import BuildError
+
+import buildutil
+import errno
+import os
+import socket
+import sys
+import threading
+import traceback
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+""" Returns the path of the Unix socket of the build daemon serving the project
+    manifest in the given configuration. """
+def getSocketPath(config):
+    if config.socket:
+        return os.path.abspath(config.socket)
+    return os.path.dirname(config.projectManifest) + "/.sherman-daemon.sock"
+
+def sendMessage(connection, message):
+    connection.sendall(json.dumps(message) + "\n")
+
+""" Yields the messages received on a connection until it is closed. """
+def receiveMessages(connection):
+    buffer = ""
+    while True:
+        data = connection.recv(65536)
+        if not data:
+            return
+        buffer += data
+        while "\n" in buffer:
+            (line, buffer) = buffer.split("\n", 1)
+            yield json.loads(line)
+
+
+# Takes the place of stdout and stderr while the daemon handles a request, and
+# sends everything printed to the client. Locale workers forked during the
+# build inherit it, and write to the same connection.
+class ClientOutput(object):
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.disconnected = False
+
+    def write(self, text):
+        if not text or self.disconnected:
+            return
+        if not isinstance(text, unicode):
+            text = text.decode("utf-8", "replace")
+
+        with self.lock:
+            try:
+                sendMessage(self.connection, { "output": text })
+            except socket.error:
+                self.disconnected = True # keep building, the client may come back for the result
+
+    def flush(self):
+        pass
+
+
+# Keeps warm project builders around between builds, so that every build
+# requested by a client reuses the in-memory state of the previous build with
+# the same target and build directory: loaded features, read and processed
+# sources, compiled stylesheets and so on.
+#
+# Clients send the command line arguments they would pass to build.py, and get
+# back the console output of the build and its exit status. Requests are
+# handled one at a time.
+class BuildDaemon(object):
+
+    def __init__(self, config, parseOptions, getTargetConfigs, createBuilder):
+        self.config = config
+        self.parseOptions = parseOptions
+        self.getTargetConfigs = getTargetConfigs
+        self.createBuilder = createBuilder
+
+        self.socketPath = getSocketPath(config)
+
+        # (target, buildDir, cache) => ProjectBuilder
+        self.builders = {}
+
+    def serve(self):
+        if os.path.exists(self.socketPath):
+            if self.isListening():
+                raise BuildError("A build daemon is already listening on %s" % self.socketPath)
+            os.unlink(self.socketPath) # left behind by a daemon that was killed
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(self.socketPath)
+            server.listen(5)
+
+            print "Build daemon for %s listening on %s..." % (self.config.projectManifest, self.socketPath)
+            sys.stdout.flush()
+
+            while True:
+                try:
+                    (connection, address) = server.accept()
+                except socket.error, error:
+                    if error.args[0] == errno.EINTR:
+                        continue
+                    raise
+
+                try:
+                    self.handleConnection(connection)
+                except socket.error, error:
+                    print "Lost connection to client: %s" % error
+                finally:
+                    connection.close()
+        except KeyboardInterrupt:
+            print "\nExit."
+        finally:
+            server.close()
+            os.unlink(self.socketPath)
+
+    def isListening(self):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(self.socketPath)
+            return True
+        except socket.error:
+            return False
+        finally:
+            client.close()
+
+    def handleConnection(self, connection):
+        request = None
+        for message in receiveMessages(connection):
+            request = message
+            break
+        if request is None:
+            return
+
+        print "Building: %s" % " ".join(request["args"])
+        sys.stdout.flush()
+
+        output = ClientOutput(connection)
+        (stdout, stderr) = (sys.stdout, sys.stderr)
+        (sys.stdout, sys.stderr) = (output, output)
+        try:
+            exitStatus = self.build(request["args"], request["cwd"])
+        finally:
+            (sys.stdout, sys.stderr) = (stdout, stderr)
+
+        print "Build finished with exit status %d." % exitStatus
+        sys.stdout.flush()
+
+        if not output.disconnected:
+            sendMessage(connection, { "exitStatus": exitStatus })
+
+    """ Runs the build requested by the given command line arguments, as if
+        build.py was run from the given working directory. Returns the exit
+        status for the client. """
+    def build(self, args, cwd):
+        try:
+            os.chdir(cwd)
+            config = self.parseOptions(args)
+        except SystemExit, exit:
+            return exit.code or 0 # invalid options were reported already
+        except OSError, error:
+            print "Could not change to directory %s: %s" % (cwd, error)
+            return 1
+
+        if config.projectManifest != self.config.projectManifest:
+            print "This build daemon builds %s, not %s" % (self.config.projectManifest, config.projectManifest)
+            return 1
+        if config.serve or config.continuousBuild or config.daemon:
+            print "The build daemon only runs single builds"
+            return 1
+        if config.lowMemory:
+            print "The build daemon keeps the state of modules for the next build, so it cannot build in low-memory mode"
+            return 1
+
+        # the builders of multiple targets share work only during this request,
+        # so the daemon doesn't accumulate results for outdated inputs
+        memo = buildutil.Memo() if len(config.targets) > 1 else None
+        for targetConfig in self.getTargetConfigs(config):
+            if memo:
+                print "Building target %s..." % targetConfig.target
+            exitStatus = self.buildTarget(targetConfig, memo)
+            if exitStatus != 0:
+                return exitStatus
+        return 0
+
+    def buildTarget(self, config, memo):
+        key = (config.target, os.path.abspath(config.buildDir) if config.buildDir else None, config.cache)
+        builder = None
+        try:
+            if key in self.builders:
+                builder = self.builders[key]
+                builder.config = config
+                builder.profiler.enabled = config.profileBuild
+                builder.loadProjectManifest()
+
+                # the warm builder only writes the outputs of what changed
+                if not builder.hasOutputs():
+                    print "Outputs of the previous build are missing, building from scratch..."
+                    builder = None
+                elif builder.featuresChanged():
+                    print "Features of target %s changed, building from scratch..." % config.target
+                    builder = None
+
+            if not builder:
+                builder = self.createBuilder(config)
+                self.builders[key] = builder
+
+            builder.setMemo(memo)
+            builder.build()
+            return 0
+        except BuildError, error:
+            error.printMessage()
+            return 1
+        except Exception, exception:
+            # the state of the builder cannot be trusted anymore
+            traceback.print_exc()
+            self.builders.pop(key, None)
+            return 1
+        finally:
+            if builder:
+                builder.setMemo(None)
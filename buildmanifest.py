@@ -0,0 +1,148 @@
+from __future__ import with_statement
+
+import buildutil
+import os
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+MANIFEST_FILE_NAME = "build-manifest.json"
+
+""" Returns the file name of the manifest of a target. Targets may share a
+    build directory, so each writes its own manifest. """
+def getManifestFileName(target):
+    if target is None:
+        return MANIFEST_FILE_NAME
+    return "build-manifest.%s.json" % target
+
+
+# Writes build-manifest.<target>.json to the build directory, listing every
+# output file of the build with the module and locale it belongs to, the hash
+# of its content and its size. Files with a gzipped sibling, written with
+# --gzip, also list the size of the sibling. The manifest also lists the files
+# that were added, changed or removed since the previous manifest, so that
+# deploy tooling only needs to upload what changed and can prune the rest. The
+# difference is only ever taken with the previous manifest of the same target,
+# so files of other targets sharing the build directory are never listed as
+# removed.
+#
+# The manifest looks like this:
+#
+#     {
+#         "target": "distribution",
+#         "files": {
+#             "core.0123456789ab.en_US.js": {
+#                 "module": "core",
+#                 "locale": "en_US",
+#                 "hash": "0123456789ab",
+#                 "size": 12345,
+#                 "gzipSize": 3456
+#             },
+#             ...
+#         },
+#         "diff": {
+#             "added": [ fileName, ... ],
+#             "changed": [ fileName, ... ],
+#             "removed": [ fileName, ... ]
+#         }
+#     }
+#
+# The module is null for files belonging to the project as a whole, like the
+# boot HTML, and the locale is null for files shared by all locales. Without
+# --gzip, the files have no "gzipSize".
+class BuildManifest(object):
+
+    def __init__(self, buildDir, target = None):
+        self.buildDir = buildDir
+        self.target = target
+        self.fileName = getManifestFileName(target)
+
+        # fileName => (signature of the file, { "hash", "size", "gzipSize" })
+        self.fileInfo = {}
+
+    """ Writes the manifest for the given output files, which map file names to
+        tuples (moduleName, locale), using the given output writer. Returns the
+        difference with the previous manifest. """
+    def write(self, outputWriter, outputFiles):
+        files = {}
+        for (fileName, (moduleName, locale)) in outputFiles.items():
+            if fileName == self.fileName:
+                continue
+
+            entry = dict(self.getFileInfo(fileName, fileName + ".gz" in outputFiles))
+            entry["module"] = moduleName
+            entry["locale"] = locale
+            files[fileName] = entry
+
+        # forget about files that are gone
+        for fileName in self.fileInfo.keys():
+            if not fileName in files:
+                del self.fileInfo[fileName]
+
+        previousFiles = self.readPreviousFiles()
+        diff = {
+            "added": sorted(fileName for fileName in files if not fileName in previousFiles),
+            "changed": sorted(fileName for fileName in files if fileName in previousFiles and
+                              previousFiles[fileName].get("hash") != files[fileName]["hash"]),
+            "removed": sorted(fileName for fileName in previousFiles if not fileName in files)
+        }
+
+        manifest = json.dumps({ "target": self.target, "files": files, "diff": diff }, indent = 4, sort_keys = True)
+        outputWriter.writeFile(self.fileName, manifest)
+
+        return diff
+
+    """ Returns the hash and size of an output file, and the size of its
+        gzipped sibling, if there is one. """
+    def getFileInfo(self, fileName, hasGzipSibling = False):
+        path = self.buildDir + "/" + fileName
+
+        # output files are replaced by renaming, so a rewritten file gets a new
+        # inode
+        stat = os.stat(path)
+        signature = (stat.st_ino, stat.st_mtime, stat.st_size)
+        if fileName in self.fileInfo and self.fileInfo[fileName][0] == signature:
+            return self.fileInfo[fileName][1]
+
+        with open(path, "rb") as f:
+            content = f.read()
+
+        info = {
+            "hash": buildutil.getContentHash(content),
+            "size": len(content)
+        }
+        if hasGzipSibling:
+            info["gzipSize"] = os.path.getsize(path + ".gz")
+        self.fileInfo[fileName] = (signature, info)
+        return info
+
+    """ Returns the names of the output files of the previous build of the same
+        target in the build directory, as listed by its manifest. """
+    def getPreviousOutputs(self):
+        # only files inside the build directory
+        return [fileName for fileName in self.readPreviousFiles()
+                if not os.path.isabs(fileName) and not os.path.normpath(fileName).startswith("..")]
+
+    def readPreviousFiles(self):
+        return self.readPreviousManifest().get("files", {})
+
+    """ Returns the previous manifest of the same target in the build directory,
+        or an empty one if there is none. """
+    def readPreviousManifest(self):
+        path = self.buildDir + "/" + self.fileName
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, "r") as f:
+                manifest = json.load(f)
+        except Exception, exception:
+            print "Ignoring unreadable %s: %s" % (self.fileName, exception)
+            return {}
+
+        if manifest.get("target") != self.target:
+            return {}
+        return manifest
@@ -0,0 +1,200 @@
+from __future__ import with_statement
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# per-thread CPU usage is only available on Linux, where RUSAGE_THREAD is 1 even
+# though older Pythons don't define the constant
+if resource and sys.platform.startswith("linux"):
+    RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", 1)
+
+    def getCpuTime():
+        usage = resource.getrusage(RUSAGE_THREAD)
+        return usage.ru_utime + usage.ru_stime
+else:
+    getCpuTime = time.clock
+
+
+class NullPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+NULL_PHASE = NullPhase()
+
+
+class Phase(object):
+
+    def __init__(self, profiler, name, moduleName, locale, featureName):
+        self.profiler = profiler
+        self.name = name
+        self.moduleName = moduleName
+        self.locale = locale
+        self.featureName = featureName
+
+    def __enter__(self):
+        threadState = self.profiler.threadState
+        if not hasattr(threadState, "contexts"):
+            threadState.contexts = []
+        threadState.contexts.append((self.moduleName, self.locale))
+
+        self.startTime = time.time()
+        self.startCpuTime = getCpuTime()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        wallTime = time.time() - self.startTime
+        cpuTime = getCpuTime() - self.startCpuTime
+
+        self.profiler.threadState.contexts.pop()
+
+        self.profiler.addEvents([{
+            "phase": self.name,
+            "feature": self.featureName,
+            "module": self.moduleName,
+            "locale": self.locale,
+            "start": self.startTime,
+            "wall": wallTime,
+            "cpu": cpuTime,
+            "pid": os.getpid(),
+            "tid": threading.current_thread().ident
+        }])
+        return False
+
+
+# Records the wall and CPU time spent in every phase of the build, keyed by
+# feature, module and locale. Phases without a module or locale inherit them
+# from the phase they are nested in, so feature hooks are attributed to the
+# module and locale being built. When disabled, phases cost next to nothing.
+class BuildProfiler(object):
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+
+        self.lock = threading.Lock()
+        self.threadState = threading.local()
+
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.startTime = time.time()
+            self.events = []
+
+    """ Returns a context manager timing a phase of the build. """
+    def phase(self, name, moduleName = None, locale = None, featureName = None):
+        if not self.enabled:
+            return NULL_PHASE
+
+        contexts = getattr(self.threadState, "contexts", None)
+        if contexts:
+            (contextModuleName, contextLocale) = contexts[-1]
+            moduleName = moduleName or contextModuleName
+            locale = locale or contextLocale
+
+        return Phase(self, name, moduleName, locale, featureName)
+
+    """ Adds events recorded elsewhere, like in the worker processes building
+        locales. """
+    def addEvents(self, events):
+        with self.lock:
+            self.events.extend(events)
+
+    """ Returns the events recorded so far and forgets them, for passing them
+        from a worker process to the parent. """
+    def takeEvents(self):
+        with self.lock:
+            events = self.events
+            self.events = []
+            return events
+
+    def getReport(self):
+        phases = {}
+        features = {}
+        modules = {}
+        for event in self.events:
+            key = (event["phase"], event["feature"], event["module"], event["locale"])
+            if not key in phases:
+                phases[key] = {
+                    "phase": event["phase"],
+                    "feature": event["feature"],
+                    "module": event["module"],
+                    "locale": event["locale"],
+                    "calls": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0
+                }
+            phases[key]["calls"] += 1
+            phases[key]["wall"] += event["wall"]
+            phases[key]["cpu"] += event["cpu"]
+
+            # only hooks are attributed to features, and they may be nested
+            # in other hooks, so these totals may overlap
+            if event["feature"]:
+                self.addTotal(features, event["feature"], event)
+            elif event["phase"] == "buildModule":
+                self.addTotal(modules, event["module"], event)
+
+        return {
+            "totalTime": time.time() - self.startTime,
+            "phases": sorted(phases.values(), key = lambda phase: -phase["wall"]),
+            "features": features,
+            "modules": modules
+        }
+
+    def addTotal(self, totals, name, event):
+        if not name in totals:
+            totals[name] = { "wall": 0.0, "cpu": 0.0 }
+        totals[name]["wall"] += event["wall"]
+        totals[name]["cpu"] += event["cpu"]
+
+    """ Returns the events in the Chrome trace event format, which can be
+        loaded in chrome://tracing and compatible viewers. """
+    def getTrace(self):
+        traceEvents = []
+        for event in self.events:
+            name = event["phase"]
+            if event["feature"]:
+                name = event["feature"] + "." + name
+
+            args = { "cpu": event["cpu"] }
+            for key in ["feature", "module", "locale"]:
+                if event[key]:
+                    args[key] = event[key]
+
+            traceEvents.append({
+                "name": name,
+                "cat": "feature" if event["feature"] else "build",
+                "ph": "X",
+                "ts": int((event["start"] - self.startTime) * 1000000),
+                "dur": int(event["wall"] * 1000000),
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "args": args
+            })
+
+        return { "traceEvents": traceEvents, "displayTimeUnit": "ms" }
+
+    def writeReports(self, reportPath, tracePath):
+        with open(reportPath, "w") as f:
+            f.write(json.dumps(self.getReport(), indent = 4))
+        with open(tracePath, "w") as f:
+            f.write(json.dumps(self.getTrace()))
+
+        print "Wrote build profile to %s and %s" % (reportPath, tracePath)
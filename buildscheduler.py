@@ -0,0 +1,111 @@
+from builderror import BuildError
+
+import Queue
+import threading
+
+
+class ModuleScheduler(object):
+
+    def __init__(self, projectBuilder, jobs):
+        self.projectBuilder = projectBuilder
+        self.jobs = jobs
+
+    """ Builds the given modules using a pool of worker threads. A module is
+        handed to a worker as soon as all of its prerequisites are built. """
+    def buildModules(self, moduleNames):
+        prerequisites = self.resolvePrerequisites(moduleNames)
+
+        dependents = dict((moduleName, []) for moduleName in moduleNames)
+        pendingCounts = {}
+        for moduleName in moduleNames:
+            for prerequisite in prerequisites[moduleName]:
+                dependents[prerequisite].append(moduleName)
+            pendingCounts[moduleName] = len(prerequisites[moduleName])
+
+        readyQueue = Queue.Queue()
+        doneQueue = Queue.Queue()
+
+        scheduled = []
+        for moduleName in moduleNames:
+            if pendingCounts[moduleName] == 0:
+                readyQueue.put(moduleName)
+                scheduled.append(moduleName)
+
+        workers = []
+        for i in range(min(self.jobs, len(moduleNames))):
+            worker = threading.Thread(target = self.work, args = (readyQueue, doneQueue))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        error = None
+        numFinished = 0
+        try:
+            while numFinished < len(scheduled):
+                (moduleName, exception) = self.waitForResult(doneQueue)
+                numFinished += 1
+
+                if exception:
+                    error = error or exception
+                if error:
+                    continue # let running modules finish, but don't start new ones
+
+                for dependent in dependents[moduleName]:
+                    pendingCounts[dependent] -= 1
+                    if pendingCounts[dependent] == 0:
+                        readyQueue.put(dependent)
+                        scheduled.append(dependent)
+        finally:
+            for worker in workers:
+                readyQueue.put(None)
+
+        if error:
+            raise error
+
+        if len(scheduled) < len(moduleNames):
+            unscheduled = [moduleName for moduleName in moduleNames if not moduleName in scheduled]
+            raise BuildError("Circular dependency detected between modules %s" % ", ".join(unscheduled))
+
+    def resolvePrerequisites(self, moduleNames):
+        builder = self.projectBuilder
+        defaultLocale = builder.projectManifest["defaultLocale"]
+
+        prerequisites = {}
+        for moduleName in moduleNames:
+            builder.loadModuleManifest(moduleName, builder.findModulePath(moduleName))
+            manifest = builder.currentBuild.files[defaultLocale][moduleName]["__manifest__"]
+
+            prerequisites[moduleName] = list(manifest["dependencies"])
+
+            # features like namespace, modules and inline need the boot module
+            # to be built before any other module
+            if moduleName != "boot" and "boot" in moduleNames and not "boot" in prerequisites[moduleName]:
+                prerequisites[moduleName].append("boot")
+
+            for prerequisite in prerequisites[moduleName]:
+                if not prerequisite in moduleNames:
+                    raise BuildError("Module %s depends on module %s, which is not part of the target" % (moduleName, prerequisite))
+
+        return prerequisites
+
+    def waitForResult(self, doneQueue):
+        while True:
+            try:
+                # use a timeout, or the main thread won't respond to Ctrl+C
+                return doneQueue.get(True, 1)
+            except Queue.Empty:
+                pass
+
+    def work(self, readyQueue, doneQueue):
+        while True:
+            moduleName = readyQueue.get()
+            if moduleName is None:
+                return
+
+            try:
+                self.projectBuilder.buildModule(moduleName)
+                doneQueue.put((moduleName, None))
+            except BuildError, error:
+                doneQueue.put((moduleName, error))
+            except Exception, exception:
+                doneQueue.put((moduleName, BuildError("Could not build module %s" % moduleName, exception)))
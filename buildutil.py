@@ -2,9 +2,13 @@ from __future__ import with_statement
 from builderror import BuildError
 
 import base64
+import collections
 import hashlib
 import os
 import re
+import struct
+import threading
+import zlib
 
 
 htmlEscapeTable = {
@@ -15,6 +19,82 @@ htmlEscapeTable = {
     "<": "&lt;"
 }
 
+""" Returns a property whose value is kept separately for every thread. Objects
+    using it should assign a threading.local() instance to self.threadState. """
+def threadLocalProperty(name, default = None):
+    def getValue(self):
+        return getattr(self.threadState, name, default)
+    def setValue(self, value):
+        setattr(self.threadState, name, value)
+    return property(getValue, setValue)
+
+# Holds the content of a module as a list of chunks, so that features can
+# append and prepend to it without copying the whole content every time. The
+# chunks are only joined when a feature needs the flat text.
+class ChunkBuffer(object):
+
+    def __init__(self, text = ""):
+        self.chunks = collections.deque()
+        if text:
+            self.chunks.append(text)
+
+    def append(self, text):
+        if text:
+            self.chunks.append(text)
+
+    def prepend(self, text):
+        if text:
+            self.chunks.appendleft(text)
+
+    def __iadd__(self, text):
+        self.append(text)
+        return self
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    """ Replaces every chunk by the result of the given function. Only use this
+        with functions that can handle text being split at arbitrary points. """
+    def map(self, function):
+        self.chunks = collections.deque(function(chunk) for chunk in self.chunks)
+
+    """ Returns the content as a single string. """
+    def getText(self):
+        if len(self.chunks) == 0:
+            return ""
+        if len(self.chunks) > 1:
+            text = "".join(self.chunks)
+            self.chunks = collections.deque([text])
+        return self.chunks[0]
+
+    """ Writes the content to the given file, chunk by chunk. """
+    def writeTo(self, f):
+        for chunk in self.chunks:
+            f.write(chunk)
+
+# Remembers the results of expensive computations, like reading files or
+# compiling stylesheets and templates, so that the builders of several targets
+# built in the same process can share them. Keys should cover everything the
+# result depends on.
+class Memo(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    """ Returns the value remembered under the key, or computes and remembers
+        it using the given function. """
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.values:
+                return self.values[key]
+
+        value = compute()
+
+        with self.lock:
+            self.values[key] = value
+        return value
+
 """ Produce entities within text. """
 def htmlEscape(text):
     return "".join(htmlEscapeTable.get(c, c) for c in text)
@@ -61,16 +141,32 @@ def base64EncodeImage(path):
         b64Image = "data:%s;base64,%s" % (mimeTypeForExtension(extension), base64.b64encode(f.read()))
     return b64Image
 
-""" Returns a 12 byte hash for the given content. """
+""" Returns a 12 byte hash for the given content, which may also be given as a
+    ChunkBuffer. """
 def getContentHash(content):
-    if isinstance(content, unicode):
-        return hashlib.md5(content.encode("utf-8")).hexdigest()[:12]
-    else:
-        return hashlib.md5(content).hexdigest()[:12]
+    m = hashlib.md5()
+    for chunk in (content.chunks if isinstance(content, ChunkBuffer) else [content]):
+        m.update(chunk.encode("utf-8") if isinstance(chunk, unicode) else chunk)
+    return m.hexdigest()[:12]
+
+""" Returns the content compressed at the maximum level in the gzip format.
+    The header contains no file name or time stamp, so identical content
+    always gives identical results. The header is written here rather than by
+    gzip.GzipFile, which only accepts a time stamp from Python 2.7 on. """
+GZIP_HEADER = "\037\213\010\000\000\000\000\000\002\377"
+def gzipContent(content):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0)
+    return "".join([
+        GZIP_HEADER,
+        compressor.compress(content),
+        compressor.flush(),
+        struct.pack("<LL", zlib.crc32(content) & 0xffffffff, len(content) & 0xffffffff)
+    ])
 
 """ Returns the proper output file name for a file, given the module name, base
     name, file content, locale and extension. """
-fileNamePattern = "{moduleName}{.baseName}{.md5}{.locale}{.extension}"
+DEFAULT_FILE_NAME_PATTERN = "{moduleName}{.baseName}{.md5}{.locale}{.extension}"
+fileNamePattern = DEFAULT_FILE_NAME_PATTERN
 def getDestinationFileName(moduleName, baseName, content, locale, extension, pattern = ""):
     global fileNamePattern
 
@@ -93,3 +189,10 @@ def getDestinationFileName(moduleName, baseName, content, locale, extension, pat
     fileName = replacePlaceholder(fileName, "locale", locale if locale != "*" else "")
     fileName = replacePlaceholder(fileName, "extension", extension[1:] if extension.startswith(".") else extension)
     return fileName
+
+""" Returns whether getDestinationFileName() includes the hash of the given
+    content in the file name, when using the given pattern. """
+def isContentAddressed(content, pattern = ""):
+    if pattern == "":
+        pattern = fileNamePattern
+    return bool(content) and re.search(r"\{.?md5.?\}", pattern) is not None
@@ -0,0 +1,68 @@
+import buildutil
+
+
+""" Yields the texts among the given values of a module's state, including the
+    chunks of ChunkBuffers. """
+def getTexts(values):
+    for value in values:
+        if isinstance(value, basestring):
+            yield value
+        elif isinstance(value, buildutil.ChunkBuffer):
+            for chunk in value.chunks:
+                yield chunk
+
+
+# Interns the texts kept in the build state, so that all locales share a single
+# copy of every text that is identical for them, like sources and most of the
+# concatenated content of modules. As texts are immutable, a feature rewriting
+# the text for one locale simply gets a copy of its own, leaving the shared
+# copy alone.
+#
+# Texts stay in the store until they are no longer found in the state of any
+# module when the store is purged, or until the state using them is released.
+# Forgetting a text that is still used elsewhere never frees it, it merely
+# isn't shared with copies interned later.
+class ContentStore(object):
+
+    def __init__(self):
+        # (type, text) => the same text. the type is part of the key, as equal
+        # str and unicode instances should not replace each other
+        self.contents = {}
+
+    """ Returns the shared copy of the given text. """
+    def intern(self, text):
+        return self.contents.setdefault((text.__class__, text), text)
+
+    """ Replaces all texts in a module's state by their shared copies,
+        including the chunks of ChunkBuffers. """
+    def internModule(self, module):
+        for (key, value) in module.items():
+            if isinstance(value, basestring):
+                module[key] = self.intern(value)
+            elif isinstance(value, buildutil.ChunkBuffer):
+                value.map(self.intern)
+
+    """ Forgets the given texts, or the texts in the given ChunkBuffers, as the
+        state using them was released. """
+    def discard(self, values):
+        for text in getTexts(values):
+            key = (text.__class__, text)
+            if self.contents.get(key) is text:
+                self.contents.pop(key, None)
+
+    """ Forgets every text that is not used by the given module states, which
+        should be all module states of the build. Only call this while no
+        module is being built. Returns the number of texts still in the
+        store. """
+    def purge(self, modules):
+        liveKeys = set()
+        for module in modules:
+            for text in getTexts(module.values()):
+                key = (text.__class__, text)
+                if self.contents.get(key) is text:
+                    liveKeys.add(key)
+
+        for key in self.contents.keys():
+            if not key in liveKeys:
+                del self.contents[key]
+        return len(self.contents)
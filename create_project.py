@@ -41,41 +41,46 @@ def copyTemplate(source, destination, variables):
         with codecs.open(destination, "w", "utf-8") as destinationFile:
             destinationFile.write(content)
 
+""" Creates a new project with the boot and core modules from the templates
+    directory. """
+def createProject(projectName, targetDirectory, namespace):
+    shermanPath = os.path.dirname(os.path.abspath(__file__))
+
+    os.mkdir(targetDirectory)
+    copyTemplate(shermanPath + "/templates/Makefile", targetDirectory + "/Makefile", {
+        "shermanPath": shermanPath
+    })
+    copyTemplate(shermanPath + "/templates/project-manifest.json", targetDirectory + "/project-manifest.json", {
+        "title": projectName
+    })
+
+    os.mkdir(targetDirectory + "/boot")
+    copyTemplate(shermanPath + "/templates/boot.tpl.html", targetDirectory + "/boot/boot.tpl.html", {
+        "title": buildutil.htmlEscape(projectName)
+    })
+    shutil.copy(shermanPath + "/templates/favicon.ico", targetDirectory + "/boot/favicon.ico")
+
+    os.mkdir(targetDirectory + "/modules")
+    shutil.copytree(shermanPath + "/templates/core/css", targetDirectory + "/modules/core/css")
+    shutil.copytree(shermanPath + "/templates/core/i18n", targetDirectory + "/modules/core/i18n")
+    shutil.copytree(shermanPath + "/templates/core/js", targetDirectory + "/modules/core/js")
+    shutil.copytree(shermanPath + "/templates/core/tmpl", targetDirectory + "/modules/core/tmpl")
+    copyTemplate(shermanPath + "/templates/core/manifest.json", targetDirectory + "/modules/core/manifest.json", {
+        "namespace": namespace
+    })
+
+    shutil.copytree(shermanPath + "/templates/boot/js", targetDirectory + "/modules/boot/js")
+    copyTemplate(shermanPath + "/templates/boot/manifest.json", targetDirectory + "/modules/boot/manifest.json", {
+        "namespace": namespace
+    })
+
+    os.mkdir(targetDirectory + "/docs")
+
 if __name__ == "__main__":
     config = parseOptions()
 
     try:
-        shermanPath = os.path.dirname(os.path.abspath(__file__))
-        
-        os.mkdir(config.targetDirectory)
-        copyTemplate(shermanPath + "/templates/Makefile", config.targetDirectory + "/Makefile", {
-            "shermanPath": shermanPath
-        })
-        copyTemplate(shermanPath + "/templates/project-manifest.json", config.targetDirectory + "/project-manifest.json", {
-            "title": config.projectName
-        })
-
-        os.mkdir(config.targetDirectory + "/boot")
-        copyTemplate(shermanPath + "/templates/boot.tpl.html", config.targetDirectory + "/boot/boot.tpl.html", {
-            "title": buildutil.htmlEscape(config.projectName)
-        })
-        shutil.copy(shermanPath + "/templates/favicon.ico", config.targetDirectory + "/boot/favicon.ico")
-
-        os.mkdir(config.targetDirectory + "/modules")
-        shutil.copytree(shermanPath + "/templates/core/css", config.targetDirectory + "/modules/core/css")
-        shutil.copytree(shermanPath + "/templates/core/i18n", config.targetDirectory + "/modules/core/i18n")
-        shutil.copytree(shermanPath + "/templates/core/js", config.targetDirectory + "/modules/core/js")
-        shutil.copytree(shermanPath + "/templates/core/tmpl", config.targetDirectory + "/modules/core/tmpl")
-        copyTemplate(shermanPath + "/templates/core/manifest.json", config.targetDirectory + "/modules/core/manifest.json", {
-            "namespace": config.namespace
-        })
-
-        shutil.copytree(shermanPath + "/templates/boot/js", config.targetDirectory + "/modules/boot/js")
-        copyTemplate(shermanPath + "/templates/boot/manifest.json", config.targetDirectory + "/modules/boot/manifest.json", {
-            "namespace": config.namespace
-        })
-
-        os.mkdir(config.targetDirectory + "/docs")
+        createProject(config.projectName, config.targetDirectory, config.namespace)
 
         print "Created project %s in directory %s." % (config.projectName, config.targetDirectory)
     except Exception, exception:
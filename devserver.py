@@ -0,0 +1,361 @@
+from __future__ import with_statement
+from builderror import BuildError
+
+import BaseHTTPServer
+import CGIHTTPServer
+import SocketServer
+import bootpage
+import buildutil
+import cgi
+import contextlib
+import os
+import random
+import shutil
+import threading
+import time
+import traceback
+import urlparse
+
+
+# Raised when a build failed with an exception other than a BuildError, to
+# every request that asked for that build. The message is the traceback of the
+# original exception.
+class UnexpectedBuildError(Exception):
+    pass
+
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    allow_reuse_address = True
+
+    # don't keep the server alive for requests still waiting on a build
+    daemon_threads = True
+
+
+# Serves a project from its build directory, handling every request in a thread
+# of its own.
+#
+# Requests for the boot page and the boot module rebuild the project, but only
+# if any of the files used by the build changed since the last build, and only
+# one build runs at a time: requests asking for a build while one is running
+# share its result. Requests for module outputs and for files that don't exist
+# (yet) wait until the running build finished, while files that already exist
+# are served right away, as output files are replaced atomically.
+#
+# The boot page is rendered from memory as well, rather than by running the
+# cgi-bin/index.py script, unless the project comes with a script of its own.
+#
+# Output files are served from memory where possible, with the hash of their
+# content as ETag, so that clients reloading the project only transfer what
+# changed. Files whose URL contains the hash of their content are sent as
+# immutable.
+class DevServer(object):
+
+    def __init__(self, projectBuilder):
+        self.projectBuilder = projectBuilder
+        self.projectBuilder.outputWriter.keepFilesInMemory()
+
+        if not os.path.exists(projectBuilder.projectDir + "/cgi-bin/index.py"):
+            self.projectBuilder.bootPageCache = bootpage.BootPageCache()
+
+        # created when serving starts
+        self.watcher = None
+
+        # guards the building flag and the number of readers, readers being
+        # requests that look at the state of the build
+        self.condition = threading.Condition()
+        self.building = False
+        self.numReaders = 0
+
+        # the number of builds done, and the error of the last one, for
+        # requests sharing a build
+        self.numBuilds = 0
+        self.buildError = None
+
+        # whether the last build succeeded, so that it needn't be repeated as
+        # long as nothing changes
+        self.upToDate = False
+
+    def serve(self):
+        builder = self.projectBuilder
+
+        if os.path.exists(builder.projectDir + "/cgi-bin"):
+            shutil.copytree(builder.projectDir + "/cgi-bin", builder.buildDir + "/cgi-bin")
+        else:
+            shutil.copytree(builder.shermanDir + "/cgi-bin", builder.buildDir + "/cgi-bin")
+        os.system("chmod -R a+rwx " + builder.buildDir)
+
+        # start watching before the first build, so no change goes unnoticed
+        self.watcher = builder.createWatcher()
+        print "Watching for changes using %s..." % self.watcher.name
+
+        # set working directory as the CGIHTTPServer will only serve from current dir
+        os.chdir(builder.buildDir)
+
+        random.seed()
+
+        print "Serving at http://localhost:%i/" % builder.config.port
+        httpd = ThreadingHTTPServer(("0.0.0.0", builder.config.port), self.createRequestHandler())
+        httpd.serve_forever()
+
+    """ Rebuilds the project if anything changed since the last build, once
+        the requests reading the state of the previous build are done. If a
+        build is running already, waits for that one instead, raising its
+        error if it failed. Exceptions other than build errors are raised as
+        UnexpectedBuildError. """
+    def build(self):
+        builder = self.projectBuilder
+
+        with self.condition:
+            if self.building:
+                numBuilds = self.numBuilds
+                while self.numBuilds == numBuilds:
+                    self.condition.wait()
+                if self.buildError:
+                    raise self.buildError
+                return
+
+            self.building = True
+            while self.numReaders > 0:
+                self.condition.wait()
+
+        error = None
+        try:
+            if self.hasChanges():
+                # mark the build outdated until it succeeds, even on errors
+                # other than build errors
+                self.upToDate = False
+                builder.loadProjectManifest()
+                shutil.copy(builder.config.projectManifest, builder.buildDir)
+                builder.build()
+                self.upToDate = True
+        except BuildError, error:
+            raise
+        except Exception:
+            trace = traceback.format_exc()
+            print trace
+            error = UnexpectedBuildError(trace)
+            raise error
+        finally:
+            with self.condition:
+                self.building = False
+                self.numBuilds += 1
+                self.buildError = error
+                self.condition.notifyAll()
+
+    """ Returns whether the project needs to be rebuilt, consuming the changes
+        seen by the watcher. """
+    def hasChanges(self):
+        paths = self.watcher.takeChanges()
+        if paths is not None:
+            paths = self.projectBuilder.filterChangedPaths(paths)
+        return not self.upToDate or paths is None or len(paths) > 0
+
+    def waitForBuild(self):
+        with self.condition:
+            while self.building:
+                self.condition.wait()
+
+    """ Waits for a running build to finish, and keeps the next build from
+        starting while the state of the build is being read. """
+    @contextlib.contextmanager
+    def readingBuild(self):
+        with self.condition:
+            while self.building:
+                self.condition.wait()
+            self.numReaders += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.numReaders -= 1
+                self.condition.notifyAll()
+
+    """ Returns a tuple (content, contentHash) for a file in the build
+        directory. Files written by the builder are kept in memory, apart from
+        those written by locale workers, which are read from disk. """
+    def readOutputFile(self, fileName):
+        entry = self.projectBuilder.outputWriter.getFileFromMemory(fileName)
+        if entry:
+            return entry
+
+        with open(self.projectBuilder.buildDir + "/" + fileName, "rb") as f:
+            content = f.read()
+        return (content, buildutil.getContentHash(content))
+
+    def createRequestHandler(self):
+        server = self
+        builder = self.projectBuilder
+
+        class ProjectServerRequestHandler(CGIHTTPServer.CGIHTTPRequestHandler):
+
+            def do_GET(self):
+                try:
+                    search = ""
+                    path = self.path
+                    qi = path.find("?")
+                    if qi > -1:
+                        search = path[qi:]
+                        path = path[0:qi]
+
+                    if path == "/":
+                        self.path = "/cgi-bin/index.py" + search
+                        server.build()
+
+                    if path.startswith("/") and path.endswith(".js"):
+                        moduleName = path[1:-3]
+                        if moduleName == "boot":
+                            server.build()
+                        response = None
+                        with server.readingBuild():
+                            localeFiles = builder.currentBuild.files[builder.projectManifest["defaultLocale"]]
+                            if moduleName in localeFiles:
+                                module = localeFiles[moduleName]
+                                for fileName in module["__output__"]:
+                                    if fileName.endswith(".js"):
+                                        response = self.readOutputFile(fileName)
+                                        break
+                                if not response:
+                                    raise BuildError("Module %s did not generate a JavaScript output file" % moduleName)
+                        if response:
+                            self.sendOutputFile(response, path)
+                            return
+
+                    if builder.config.simulateHighLatency:
+                        time.sleep(0.2 + 2 * random.random())
+
+                    if path == "/" and builder.bootPageCache:
+                        self.sendBootPage(search)
+                        return
+
+                    if self.is_cgi():
+                        CGIHTTPServer.CGIHTTPRequestHandler.do_GET(self)
+                        return
+
+                    # files that are not there may still be written by the
+                    # running build
+                    filePath = self.translate_path(path)
+                    if not os.path.exists(filePath):
+                        server.waitForBuild()
+
+                    if os.path.isfile(filePath):
+                        try:
+                            response = self.readOutputFile(os.path.relpath(filePath, builder.buildDir))
+                        except (IOError, OSError):
+                            self.send_error(404, "File not found") # removed after a build
+                            return
+                        self.sendOutputFile(response, path)
+                        return
+
+                    CGIHTTPServer.CGIHTTPRequestHandler.do_GET(self)
+                except BuildError, error:
+                    error.printMessage()
+                    self.sendBuildError("Build Error", str(error))
+                except UnexpectedBuildError, error:
+                    self.sendBuildError("Build Failed", str(error))
+
+            """ Sends an error page with the message of a failed build. """
+            def sendBuildError(self, title, message):
+                content = ("<html><body><h1>%s</h1><pre>%s</pre>"
+                           "<p>(check console output for more info)</p></body></html>" % (title, cgi.escape(message)))
+                self.send_response(500)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                self.wfile.write(content)
+
+            """ Sends the boot page for the locale given in the query string,
+                like the cgi-bin/index.py script does. """
+            def sendBootPage(self, search):
+                locales = builder.locales
+                locale = urlparse.parse_qs(search[1:]).get("locale", [builder.projectManifest["defaultLocale"]])[0]
+                if not locale in locales:
+                    self.send_error(400, "Unsupported locale, must be one of %s" % locales)
+                    return
+
+                with server.readingBuild():
+                    html = builder.bootPageCache.render(locale)
+                if html is None:
+                    self.send_error(404, "No boot page for locale %s" % locale)
+                    return
+
+                contentHash = buildutil.getContentHash(html)
+                self.sendOutputFile({
+                    "content": html,
+                    "contentHash": contentHash,
+                    "contentType": "text/html",
+                    "contentEncoding": None,
+                    "etag": "\"%s\"" % contentHash
+                }, "/")
+
+            def acceptsGzip(self):
+                for encoding in (self.headers.getheader("accept-encoding") or "").split(","):
+                    parameters = [parameter.strip() for parameter in encoding.split(";")]
+                    if parameters[0] == "gzip" and not "q=0" in parameters:
+                        return True
+                return False
+
+            """ Reads an output file, or its gzipped sibling if the client
+                accepts it. """
+            def readOutputFile(self, fileName):
+                path = builder.buildDir + "/" + fileName
+                (content, contentHash) = server.readOutputFile(fileName)
+                response = {
+                    "content": content,
+                    "contentHash": contentHash,
+                    "contentType": self.guess_type(path),
+                    "contentEncoding": None,
+                    "etag": "\"%s\"" % contentHash
+                }
+
+                gzipPath = path + ".gz"
+                if self.acceptsGzip() and os.path.exists(gzipPath) and os.path.getmtime(gzipPath) >= os.path.getmtime(path):
+                    (content, gzipHash) = server.readOutputFile(fileName + ".gz")
+                    response["content"] = content
+                    response["contentEncoding"] = "gzip"
+                    response["etag"] = "\"%s\"" % gzipHash
+
+                return response
+
+            def sendOutputFile(self, response, path):
+                # the content behind a URL with its hash in it never changes
+                if response["contentHash"] in os.path.basename(path):
+                    cacheControl = "public, max-age=31536000, immutable"
+                else:
+                    cacheControl = "no-cache"
+
+                notModified = self.isNotModified(response["etag"])
+                if notModified:
+                    self.send_response(304)
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", response["contentType"])
+                    if response["contentEncoding"]:
+                        self.send_header("Content-Encoding", response["contentEncoding"])
+                    self.send_header("Content-Length", str(len(response["content"])))
+                self.send_header("ETag", response["etag"])
+                self.send_header("Cache-Control", cacheControl)
+                self.send_header("Vary", "Accept-Encoding")
+                self.end_headers()
+
+                if not notModified:
+                    self.wfile.write(response["content"])
+
+            def isNotModified(self, etag):
+                ifNoneMatch = self.headers.getheader("if-none-match")
+                if not ifNoneMatch:
+                    return False
+
+                etags = [tag.strip() for tag in ifNoneMatch.split(",")]
+                return "*" in etags or etag in etags or "W/" + etag in etags
+
+            def do_POST(self):
+                if self.path == "/profile-dump":
+                    length = int(self.headers.getheader("content-length"))
+                    builder.features["profiling"].showProfileDump(self.rfile.read(length))
+                else:
+                    CGIHTTPServer.CGIHTTPRequestHandler.do_POST(self)
+
+        return ProjectServerRequestHandler
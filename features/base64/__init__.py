@@ -7,6 +7,7 @@ import re
 class Feature(ShermanFeature):
 
     @ShermanFeature.priority(90)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
     
@@ -3,14 +3,11 @@ from builderror import BuildError
 from shermanfeature import ShermanFeature
 
 import buildutil
-import codecs
-import os
 
 
 class Feature(ShermanFeature):
 
-    rebuildNeeded = False
-
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         self.rebuildNeeded = False
 
@@ -22,9 +19,8 @@ class Feature(ShermanFeature):
         try:
             for style in module["__manifest__"]["styles"]:
                 path = self.projectBuilder.resolveFile(style["path"], modulePath + "/css")
-                contents = self.projectBuilder.modifiedFiles.read(locale, path)
-                if contents:
-                    module[path] = contents
+                if self.projectBuilder.modifiedFiles.isModified(locale, path):
+                    module[path] = self.projectBuilder.modifiedFiles.readContent(locale, path)
                     self.rebuildNeeded = True
         except Exception, exception:
             raise BuildError("Could not load styles for module %s" % moduleName, exception)
@@ -54,9 +50,7 @@ class Feature(ShermanFeature):
                 try:
                     styles = module["__styles__"]
                     fileName = buildutil.getDestinationFileName(moduleName, None, styles, None, "css")
-                    if not os.path.exists(self.buildDir + "/" + fileName): # avoid multiple locales writing the same file
-                        with codecs.open(self.buildDir + "/" + fileName, "w", "utf-8") as f:
-                            f.write(styles)
+                    self.projectBuilder.outputWriter.writeFile(fileName, styles, buildutil.isContentAddressed(styles))
                     module["__output__"].append(fileName)
                 except Exception, exception:
                     raise BuildError("Could not write CSS output file for module %s" % moduleName, exception)
@@ -10,8 +10,6 @@ import subprocess
 
 class Feature(ShermanFeature):
 
-    rebuildNeeded = False
-
     def __init__(self, config):
         ShermanFeature.__init__(self, config)
 
@@ -21,6 +19,7 @@ class Feature(ShermanFeature):
             "runJsLint": False
         })
 
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         self.rebuildNeeded = False
 
@@ -32,9 +31,8 @@ class Feature(ShermanFeature):
                 continue
 
             path = self.projectBuilder.resolveFile(path, modulePath + "/tmpl")
-            contents = self.projectBuilder.modifiedFiles.read(locale, path)
-            if contents:
-                module[path] = contents
+            if self.projectBuilder.modifiedFiles.isModified(locale, path):
+                module[path] = self.projectBuilder.modifiedFiles.readContent(locale, path)
                 self.rebuildNeeded = True
 
         if not self.rebuildNeeded:
@@ -63,19 +61,24 @@ class Feature(ShermanFeature):
                 elif line.startswith("<!-- /template"):
                     template = template.replace(" href=\"#\"", " href=\"javascript:void(0)\"")
 
-                    pipes = subprocess.Popen(self.shermanDir + "/features/hogan/precompile.js", shell = True, stdin = subprocess.PIPE, stdout = subprocess.PIPE)
-                    compiledTemplate = ""
-                    while pipes.poll() == None:
-                        (stdoutdata, stderrdata) = pipes.communicate(input = template)
-                        if stderrdata != None or pipes.returncode != 0:
-                            raise BuildError("Error compiling Moustache template %s: %s" % (os.path.basename(path), stderrdata))
-                        compiledTemplate += stdoutdata
+                    compiledTemplate = self.projectBuilder.memoize(("hogan", template),
+                                                                   lambda: self.precompileTemplate(path, template))
                     module["__templates__"] += "Modules.%s.templates[\"%s\"] = new Hogan.Template(%s);\n" % (moduleName, templateId, compiledTemplate)
                     template = None
                 else:
                     if template is not None:
                         template += line
 
+    def precompileTemplate(self, path, template):
+        pipes = subprocess.Popen(self.shermanDir + "/features/hogan/precompile.js", shell = True, stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+        compiledTemplate = ""
+        while pipes.poll() == None:
+            (stdoutdata, stderrdata) = pipes.communicate(input = template)
+            if stderrdata != None or pipes.returncode != 0:
+                raise BuildError("Error compiling Moustache template %s: %s" % (os.path.basename(path), stderrdata))
+            compiledTemplate += stdoutdata
+        return compiledTemplate
+
     def isRebuildNeeded(self, locale, moduleName, modulePath):
         return self.rebuildNeeded
 
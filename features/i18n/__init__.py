@@ -13,8 +13,6 @@ except ImportError:
 
 class Feature(ShermanFeature):
 
-    rebuildNeeded = False
-
     def __init__(self, config):
         ShermanFeature.__init__(self, config)
 
@@ -23,29 +21,33 @@ class Feature(ShermanFeature):
         })
 
     @ShermanFeature.priority(10)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         self.rebuildNeeded = False
 
         path = modulePath + "/i18n/translations.json"
         if not os.path.exists(path):
+            self.projectBuilder.publishArtifact(moduleName, "__translations__", None)
             return
 
         module = self.currentBuild.files[locale][moduleName]
 
         try:
-            contents = self.projectBuilder.modifiedFiles.read(locale, path)
-            if contents:
+            if self.projectBuilder.modifiedFiles.isModified(locale, path):
                 print "    Loading translations..."
 
-                translations = json.loads(contents)
+                content = self.projectBuilder.modifiedFiles.readContent(locale, path)
+                translations = json.loads(content)
 
                 module["__translations__"] = translations
+                self.projectBuilder.publishArtifact(moduleName, "__translations__", buildutil.getContentHash(content))
 
                 module["__allTranslations__"] = {}
                 for prerequisite in module["__manifest__"]["dependencies"]:
                     prereqModule = self.currentBuild.files[locale][prerequisite]
                     if "__translations__" in prereqModule:
                         module["__allTranslations__"].update(prereqModule["__translations__"])
+                    self.projectBuilder.dependOnArtifact(moduleName, prerequisite, "__translations__")
                 module["__allTranslations__"].update(translations)
 
                 self.rebuildNeeded = True
@@ -63,7 +65,9 @@ class Feature(ShermanFeature):
         if not "__allTranslations__" in module:
             return
 
-        module["__concat__"] = self.applyTranslations(module["__allTranslations__"], locale, moduleName, module["__concat__"], escaping = "javascript")
+        # translations run before other features add to the content, so text
+        # keys are never split between chunks
+        module["__concat__"].map(lambda js: self.applyTranslations(module["__allTranslations__"], locale, moduleName, js, escaping = "javascript"))
 
         if "__templates__" in module:
             module["__templates__"] = self.applyTranslations(module["__allTranslations__"], locale, moduleName, module["__templates__"], escaping = "html")
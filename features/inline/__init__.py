@@ -1,4 +1,5 @@
 from builderror import BuildError
+from modulestate import ModuleBuildState
 from shermanfeature import ShermanFeature
 
 
@@ -13,16 +14,19 @@ class Feature(ShermanFeature):
         if "inline" in self.currentBuild.files[locale]:
             inlineModule = self.currentBuild.files[locale]["inline"]
         else:
-            inlineModule = {
+            inlineModule = ModuleBuildState({
                 "__manifest__": {
                      "namespace": bootModule["__manifest__"]["namespace"],
                      "dependencies": [],
                      "sources": []
                 }
-            }
+            })
             for l in self.projectBuilder.locales:
                 self.currentBuild.files[l]["inline"] = inlineModule
 
+        # the namespace of the boot module may have changed since
+        inlineModule["__manifest__"]["namespace"] = bootModule["__manifest__"]["namespace"]
+
         for source in bootModule["__manifest__"]["sources"]:
             if "inline" in source and source["inline"] == True:
                 path = self.projectBuilder.resolveFile(source["path"], modulePath + "/js")
@@ -39,12 +43,29 @@ class Feature(ShermanFeature):
 
         self.projectBuilder.concatenateSources(locale, "inline", modulePath)
 
+    def exportLocaleState(self, locale, moduleName):
+        if moduleName != "boot" or not "inline" in self.currentBuild.files[locale]:
+            return None
+
+        return self.currentBuild.files[locale]["inline"]
+
+    def importLocaleState(self, locale, moduleName, state):
+        if state is None:
+            return
+
+        # the inline module is shared between all locales
+        if "inline" in self.currentBuild.files[locale]:
+            self.currentBuild.files[locale]["inline"].update(state)
+        else:
+            for l in self.projectBuilder.locales:
+                self.currentBuild.files[l]["inline"] = state
+
     @ShermanFeature.priority(60)
     def generateBootstrapCode(self, locale, bootstrapCode):
         bootstrapCode["head"] = (
             "%(inlineJs)s"
             "%(head)s"
         ) % {
-            "inlineJs": self.currentBuild.files[locale]["inline"]["__concat__"],            
+            "inlineJs": self.currentBuild.files[locale]["inline"]["__concat__"].getText(),
             "head": bootstrapCode["head"]
         }
@@ -9,8 +9,6 @@ import re
 
 class Feature(ShermanFeature):
 
-    rebuildNeeded = False
-
     def __init__(self, config):
         ShermanFeature.__init__(self, config)
 
@@ -20,6 +18,7 @@ class Feature(ShermanFeature):
             "runJsLint": False
         })
 
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         self.rebuildNeeded = False
 
@@ -31,9 +30,8 @@ class Feature(ShermanFeature):
                 continue
 
             path = self.projectBuilder.resolveFile(path, modulePath + "/tmpl")
-            contents = self.projectBuilder.modifiedFiles.read(locale, path)
-            if contents:
-                module[path] = contents
+            if self.projectBuilder.modifiedFiles.isModified(locale, path):
+                module[path] = self.projectBuilder.modifiedFiles.readContent(locale, path)
                 self.rebuildNeeded = True
 
         if not self.rebuildNeeded:
@@ -1,9 +1,9 @@
 from __future__ import with_statement
 from builderror import BuildError
+from modulestate import ModuleBuildState
 from shermanfeature import ShermanFeature
 
 import buildutil
-import codecs
 import copy
 import os
 import types
@@ -16,18 +16,6 @@ except ImportError:
 
 class Feature(ShermanFeature):
 
-    def manifestLoaded(self, moduleName, modulePath, manifest):
-        if moduleName != "boot":
-            return
-
-        # make a copy of boot, as the boot module will not contain all sources
-        # when used in combination with the inline feature
-        for locale in self.projectBuilder.locales:
-            self.currentBuild.files[locale]["boot-full"] = {
-                "__manifest__": copy.deepcopy(manifest),
-                "__built__": False
-            }
-
     def modulesWritten(self):
         self.buildFullBootModule()
 
@@ -70,8 +58,7 @@ class Feature(ShermanFeature):
             bootJson = json.dumps(bootJson)
 
             fileName = buildutil.getDestinationFileName("boot", None, bootJson, locale, "json")
-            with codecs.open(self.buildDir + "/" + fileName, "w", "utf-8") as f:
-                f.write(bootJson)
+            self.projectBuilder.outputWriter.writeFile(fileName, bootJson, buildutil.isContentAddressed(bootJson), locale)
 
             bootHash = buildutil.getContentHash(bootJson)
             self.writeVersionFile("__versionjson__", locale, bootHash)
@@ -87,7 +74,16 @@ class Feature(ShermanFeature):
         inlineFeature = self.projectBuilder.features["inline"]
         del self.projectBuilder.features["inline"]
 
+        # make a copy of boot, as the boot module will not contain all sources
+        # when used in combination with the inline feature. it is rebuilt every
+        # time, as it is made from the sources of boot and inline
+        defaultLocale = self.projectBuilder.projectManifest["defaultLocale"]
+        manifest = copy.deepcopy(self.currentBuild.files[defaultLocale]["boot"]["__manifest__"])
         for locale in self.projectBuilder.locales:
+            self.currentBuild.files[locale]["boot-full"] = ModuleBuildState({
+                "__manifest__": manifest,
+                "__built__": False
+            })
             self.currentBuild.files[locale]["boot-inline"] = self.currentBuild.files[locale]["boot"]
             self.currentBuild.files[locale]["boot"] = self.currentBuild.files[locale]["boot-full"]
 
@@ -111,11 +107,16 @@ class Feature(ShermanFeature):
 
         self.projectBuilder.loadSources = types.MethodType(loadSources, self.projectBuilder, self.projectBuilder.__class__)
 
-        self.projectBuilder.buildModule("boot")
-
-        self.projectBuilder.loadSources = originalLoadSources
+        # the cache entry of boot is for the regular boot module
+        buildCache = self.projectBuilder.buildCache
+        self.projectBuilder.buildCache = None
 
-        self.projectBuilder.features["inline"] = inlineFeature
+        try:
+            self.projectBuilder.buildModule("boot")
+        finally:
+            self.projectBuilder.buildCache = buildCache
+            self.projectBuilder.loadSources = originalLoadSources
+            self.projectBuilder.features["inline"] = inlineFeature
 
     def reinstateBootModule(self):
         if not "inline" in self.projectBuilder.features:
@@ -126,5 +127,4 @@ class Feature(ShermanFeature):
 
     def writeVersionFile(self, name, locale, hash):
         filename = buildutil.getDestinationFileName(name, None, None, locale, "md5")
-        with open(self.buildDir + "/" + filename, "w") as f:
-            f.write(hash)
+        self.projectBuilder.outputWriter.writeFile(filename, hash, locale = locale)
@@ -8,6 +8,7 @@ import sys
 class Feature(ShermanFeature):
 
     @ShermanFeature.priority(60)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
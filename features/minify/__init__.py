@@ -2,6 +2,7 @@ from __future__ import with_statement
 from builderror import BuildError
 from shermanfeature import ShermanFeature
 
+import buildutil
 import codecs
 import os
 import re
@@ -16,7 +17,7 @@ class Feature(ShermanFeature):
 
         module = self.currentBuild.files[locale][moduleName]
 
-        js = module["__concat__"]
+        js = module["__concat__"].getText()
 
         js = self.preMinifyTricks(js)
 
@@ -38,7 +39,7 @@ class Feature(ShermanFeature):
         else:
             raise BuildError("Minification of module %s failed: %s" % (moduleName, err))
 
-        module["__concat__"] = js
+        module["__concat__"] = buildutil.ChunkBuffer(js)
 
     def preMinifyTricks(self, js):
 
@@ -20,6 +20,13 @@ class Feature(ShermanFeature):
             "inline": True
         })
 
+    def manifestLoaded(self, moduleName, modulePath, manifest):
+        ShermanFeature.manifestLoaded(self, moduleName, modulePath, manifest)
+
+        # modules are added to the namespace of the boot module
+        if moduleName != "boot":
+            self.projectBuilder.dependOnArtifact(moduleName, "boot", "__manifest__")
+
     @ShermanFeature.priority(100)
     def sourcesConcatenated(self, locale, moduleName, modulePath):
         if moduleName == "inline":
@@ -35,14 +42,15 @@ class Feature(ShermanFeature):
                        not (moduleName == "boot" and not "inline" in self.projectBuilder.features)) 
 
         if doStringify:
+            js.map(buildutil.jsStringEscape)
             if moduleName == "boot":
-                js = "try{%s.Modules.addModule(\"%s\",'%s')}catch(e){giveUp(e)}" % (bootNs, moduleName, buildutil.jsStringEscape(js))
+                js.prepend("try{%s.Modules.addModule(\"%s\",'" % (bootNs, moduleName))
+                js.append("')}catch(e){giveUp(e)}")
             else:
-                js = "%s.Modules.addModule(\"%s\",'%s')" % (bootNs, moduleName, buildutil.jsStringEscape(js))
+                js.prepend("%s.Modules.addModule(\"%s\",'" % (bootNs, moduleName))
+                js.append("')")
         else:
-            js += "%s.Modules.enableModule(\"%s\")" % (bootNs, moduleName)
-
-        module["__concat__"] = js
+            js.append("%s.Modules.enableModule(\"%s\")" % (bootNs, moduleName))
 
     @ShermanFeature.priority(10)
     def generateBootstrapCode(self, locale, bootstrapCode):
@@ -94,5 +102,4 @@ class HelperFeature(ShermanFeature):
             return
 
         module = self.currentBuild.files[locale][moduleName]
-        module["__concat__"] = ("Modules.%s = {};\n"
-                                "%s" % (moduleName, module["__concat__"]))
+        module["__concat__"].prepend("Modules.%s = {};\n" % moduleName)
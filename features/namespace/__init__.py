@@ -1,15 +1,21 @@
 from shermanfeature import ShermanFeature
 
+import buildutil
 import re
 
 
 class Feature(ShermanFeature):
 
     @ShermanFeature.priority(90)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
         namespace = module["__manifest__"]["namespace"]
 
+        # the namespace of the boot module is used when concatenating
+        if moduleName != "boot":
+            self.projectBuilder.dependOnArtifact(moduleName, "boot", "__manifest__")
+
         varReplacer = re.compile(r"^(?:var )?([a-zA-Z0-9.\[\]\"']+) = ", flags = re.MULTILINE)
         functionReplacer = re.compile(r"^function ([a-zA-Z0-9]+)\(", flags = re.MULTILINE)
 
@@ -41,13 +47,13 @@ class Feature(ShermanFeature):
         if moduleName == "boot" or bootNs != moduleNs:
             if bootNs != moduleNs and "modules" in self.projectBuilder.features:
                 moduleReplacer = re.compile(r"^ *Modules\.", flags = re.MULTILINE)
-                js = moduleReplacer.sub("%sModules." % (bootNs + "."), js)
-            js = ("var %s = %s || {};\n"
-                  "%s.NS = %s;\n"
-                  "with (%s) {\n%s\n}\n" % (moduleNs, moduleNs, moduleNs, moduleNs, moduleNs, js))
+                js = buildutil.ChunkBuffer(moduleReplacer.sub("%sModules." % (bootNs + "."), js.getText()))
+            js.prepend("var %s = %s || {};\n"
+                       "%s.NS = %s;\n"
+                       "with (%s) {\n" % (moduleNs, moduleNs, moduleNs, moduleNs, moduleNs))
         else:
-            js = ("with (%s) {\n"
-                  "%s\n}\n" % (moduleNs, js))
+            js.prepend("with (%s) {\n" % moduleNs)
+        js.append("\n}\n")
 
         module["__concat__"] = js
 
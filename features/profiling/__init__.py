@@ -18,6 +18,7 @@ class Feature(ShermanFeature):
             "inline": True
         })
 
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
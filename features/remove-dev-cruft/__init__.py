@@ -1,5 +1,6 @@
 from shermanfeature import ShermanFeature
 
+import buildutil
 import re
 
 
@@ -9,7 +10,7 @@ class Feature(ShermanFeature):
     def sourcesConcatenated(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
-        js = module["__concat__"]
+        js = module["__concat__"].getText()
 
         r = re.compile(r"^logging\.isDebug\s*=.*$", flags = re.MULTILINE)
         js = r.sub("", js)
@@ -23,4 +24,4 @@ class Feature(ShermanFeature):
         r = re.compile(r".*console\.log.*$", flags = re.MULTILINE)
         js = r.sub("", js)
 
-        module["__concat__"] = js
+        module["__concat__"] = buildutil.ChunkBuffer(js)
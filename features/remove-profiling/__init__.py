@@ -1,5 +1,6 @@
 from shermanfeature import ShermanFeature
 
+import buildutil
 import re
 
 
@@ -9,9 +10,9 @@ class Feature(ShermanFeature):
     def sourcesConcatenated(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
-        js = module["__concat__"]
+        js = module["__concat__"].getText()
 
         r = re.compile(r".*Profiling.(start|stop|submit|reset).*$", flags = re.MULTILINE)
         js = r.sub("", js)
 
-        module["__concat__"] = js
+        module["__concat__"] = buildutil.ChunkBuffer(js)
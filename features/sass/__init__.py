@@ -1,7 +1,13 @@
 from shermanfeature import ShermanFeature
 
+import buildutil
 import sys
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 
 class Feature(ShermanFeature):
 
@@ -19,6 +25,7 @@ class Feature(ShermanFeature):
         self.scsscompiler = scsscompiler
 
     @ShermanFeature.priority(60)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
@@ -30,18 +37,31 @@ class Feature(ShermanFeature):
 
         print "    Compiling SCSS..."
 
-        parser = self.cssparser.CSSParser()
-        options = self.cssparser.CSSOptions(stripWhiteSpace = True, stripComments = True, minimizeValues = True,
-                                            stripExtraSemicolons = True, colorize = False, compileScss = True)
-        styleSheet = parser.parse(module["__styles__"], options)
+        # the scope follows from the styles and the scopes of the prerequisites
+        fingerprint = buildutil.getContentHash(module["__styles__"])
 
-        compiler = self.scsscompiler.SCSSCompiler()
+        prerequisiteScopes = []
         for prerequisite in module["__manifest__"]["dependencies"]:
             prereqModule = self.currentBuild.files[locale][prerequisite]
             if "__scssScope__" in prereqModule:
                 print "      Including SCSS scope of module %s..." % prerequisite
-                compiler.getGlobalScope().merge(prereqModule["__scssScope__"])
+                prerequisiteScopes.append(prereqModule["__scssScope__"])
+            fingerprint += str(self.projectBuilder.dependOnArtifact(moduleName, prerequisite, "__scssScope__"))
+
+        def compile():
+            parser = self.cssparser.CSSParser()
+            options = self.cssparser.CSSOptions(stripWhiteSpace = True, stripComments = True, minimizeValues = True,
+                                                stripExtraSemicolons = True, colorize = False, compileScss = True)
+            styleSheet = parser.parse(module["__styles__"], options)
+
+            compiler = self.scsscompiler.SCSSCompiler()
+            for scope in prerequisiteScopes:
+                compiler.getGlobalScope().merge(scope)
+
+            compiler.compile(styleSheet, options)
+            return (styleSheet.toString(options), compiler.getGlobalScope())
 
-        compiler.compile(styleSheet, options)
-        module["__styles__"] = styleSheet.toString(options)
-        module["__scssScope__"] = compiler.getGlobalScope()
+        # other targets built in the same process can reuse the result
+        key = ("sass", json.dumps(self.options, sort_keys = True), fingerprint)
+        (module["__styles__"], module["__scssScope__"]) = self.projectBuilder.memoize(key, compile)
+        self.projectBuilder.publishArtifact(moduleName, "__scssScope__", buildutil.getContentHash(fingerprint))
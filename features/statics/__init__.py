@@ -7,10 +7,6 @@ import os
 
 class Feature(ShermanFeature):
 
-    timestamps = {}
-
-    rebuildNeeded = False
-
     def manifestLoaded(self, moduleName, modulePath, manifest):
         self.rebuildNeeded = False
 
@@ -19,12 +15,8 @@ class Feature(ShermanFeature):
 
         for static in manifest["statics"]:
             path = self.projectBuilder.resolveFile(static["path"], modulePath + "/statics")
-            mtime = os.stat(path).st_mtime
-            if path in self.timestamps and mtime == self.timestamps[path]:
-                continue
-
-            self.rebuildNeeded = True
-            self.timestamps[path] = mtime
+            if self.projectBuilder.modifiedFiles.isModified("*", path):
+                self.rebuildNeeded = True
 
         if not self.rebuildNeeded:
             return
@@ -43,14 +35,11 @@ class Feature(ShermanFeature):
             (baseName, extension) = os.path.splitext(fileName)
             with open(path, "r") as inFile:
                 content = inFile.read()
+            self.projectBuilder.modifiedFiles.markRead("*", path)
 
-            destFileName = buildutil.getDestinationFileName(moduleName, baseName, content, None, extension,
-                                                            pattern = "{moduleName}{.baseName}{.md5}{.extension}")
-
-            destPath = self.buildDir + "/" + destFileName
-            if not os.path.exists(destPath): # avoid multiple locales copying the same file
-                with open(destPath, "w") as outFile:
-                    outFile.write(content)
+            pattern = "{moduleName}{.baseName}{.md5}{.extension}"
+            destFileName = buildutil.getDestinationFileName(moduleName, baseName, content, None, extension, pattern = pattern)
+            self.projectBuilder.outputWriter.writeFile(destFileName, content, buildutil.isContentAddressed(content, pattern))
 
             for locale in self.projectBuilder.locales:
                 self.currentBuild.files[locale][moduleName]["__staticMap__"][static["path"]] = destFileName
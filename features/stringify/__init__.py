@@ -13,11 +13,12 @@ class Feature(ShermanFeature):
 
         bootNs = self.currentBuild.files[locale]["boot"]["__manifest__"]["namespace"]
 
-        js = buildutil.jsStringEscape(module["__concat__"])
+        js = module["__concat__"]
+        js.map(buildutil.jsStringEscape)
 
         if moduleName == "boot":
-            js = "try{%s.Modules.addModule(\"%s\",'%s')}catch(e){giveUp(e)}" % (bootNs, moduleName, js)
+            js.prepend("try{%s.Modules.addModule(\"%s\",'" % (bootNs, moduleName))
+            js.append("')}catch(e){giveUp(e)}")
         else:
-            js = "%s.Modules.addModule(\"%s\",'%s')" % (bootNs, moduleName, js)
-
-        module["__concat__"] = js
+            js.prepend("%s.Modules.addModule(\"%s\",'" % (bootNs, moduleName))
+            js.append("')")
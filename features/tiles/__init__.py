@@ -25,6 +25,7 @@ class Feature(ShermanFeature):
             "path": "/features/tiles/tiles.js"
         })
 
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
         module = self.currentBuild.files[locale][moduleName]
 
@@ -37,6 +38,15 @@ class Feature(ShermanFeature):
         if len(self.tileModuleDependencies[moduleName]) == 0:
             del self.tileModuleDependencies[moduleName]
 
+    def exportLocaleState(self, locale, moduleName):
+        return self.tileModuleDependencies.get(moduleName)
+
+    def importLocaleState(self, locale, moduleName, state):
+        if state:
+            self.tileModuleDependencies[moduleName] = state
+        elif moduleName in self.tileModuleDependencies:
+            del self.tileModuleDependencies[moduleName]
+
     def modulesWritten(self):
         for locale in self.projectBuilder.locales:
             module = self.currentBuild.files[locale]["inline"]
@@ -1,5 +1,6 @@
 from shermanfeature import ShermanFeature
 
+import buildutil
 import os
 import re
 import types
@@ -10,6 +11,7 @@ class Feature(ShermanFeature):
     substitutions = {}
 
     @ShermanFeature.priority(80)
+    @ShermanFeature.localeNeutral
     def sourcesLoaded(self, locale, moduleName, modulePath):
 
         UA = self.options["UA"]
@@ -230,6 +232,16 @@ class Feature(ShermanFeature):
 
         return js
 
+    def exportLocaleState(self, locale, moduleName):
+        if moduleName != "boot":
+            return None
+
+        return self.substitutions
+
+    def importLocaleState(self, locale, moduleName, state):
+        if state:
+            self.substitutions.update(state)
+
     @ShermanFeature.priority(80)
     def sourcesConcatenated(self, locale, moduleName, modulePath):
         UA = self.options["UA"]
@@ -238,7 +250,7 @@ class Feature(ShermanFeature):
 
         module = self.currentBuild.files[locale][moduleName]
 
-        js = module["__concat__"]
+        js = module["__concat__"].getText()
 
         for methodName in self.substitutions:
             value = self.substitutions[methodName]
@@ -250,4 +262,4 @@ class Feature(ShermanFeature):
             js = re.compile(r"\{\{if\s+true\s*\}\}(.*?)\{\{/if\}\}").sub(r"\1", js)
             js = re.compile(r"\{\{if\s+false\s*\}\}(.*?)\{\{/if\}\}").sub(r"", js)
 
-        module["__concat__"] = js 
+        module["__concat__"] = buildutil.ChunkBuffer(js) 
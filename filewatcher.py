@@ -0,0 +1,180 @@
+from __future__ import with_statement
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = "iIII"
+EVENT_HEADER_SIZE = struct.calcsize(EVENT_HEADER)
+
+# time to wait for more events after the first one, as editors tend to touch
+# a file multiple times when saving it
+SETTLE_TIME = 0.1
+
+
+""" Yields all directories below the given directories (including themselves),
+    skipping hidden directories and the excluded paths. Shallow directories are
+    yielded without descending into them. """
+def walkDirectories(directories, excludedPaths, shallowDirectories = []):
+    for directory in shallowDirectories:
+        if os.path.isdir(directory):
+            yield directory
+    for directory in directories:
+        if not os.path.isdir(directory) or directory in excludedPaths:
+            continue
+        for (path, dirNames, fileNames) in os.walk(directory):
+            dirNames[:] = [dirName for dirName in dirNames
+                           if not dirName.startswith(".") and not os.path.join(path, dirName) in excludedPaths]
+            yield path
+
+
+class InotifyWatcher(object):
+
+    name = "inotify"
+
+    def __init__(self, directories, excludedPaths, shallowDirectories = []):
+        self.excludedPaths = excludedPaths
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+        self.fd = self.libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init() failed")
+
+        self.watches = {}
+        for directory in walkDirectories(directories, excludedPaths, shallowDirectories):
+            self.addWatch(directory)
+
+    def addWatch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, directory, WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "Could not watch directory %s" % directory)
+        self.watches[wd] = directory
+
+    """ Blocks until files are changed, and returns the set of changed paths,
+        or None if changes were lost and everything should be considered
+        changed. """
+    def waitForChanges(self):
+        return self.collectChanges(None)
+
+    """ Returns the set of paths changed since the last call, or None if
+        changes were lost, without blocking unless files are being changed
+        right now. """
+    def takeChanges(self):
+        return self.collectChanges(0)
+
+    def collectChanges(self, timeout):
+        changedPaths = set()
+        while True:
+            try:
+                (readable, writable, errors) = select.select([self.fd], [], [], timeout)
+            except select.error, error:
+                if error.args[0] == errno.EINTR:
+                    continue
+                raise
+            if not readable:
+                return changedPaths
+
+            for (wd, mask, name) in self.readEvents():
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if not wd in self.watches:
+                    continue
+
+                path = os.path.join(self.watches[wd], name) if name else self.watches[wd]
+                if path in self.excludedPaths:
+                    continue
+
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    for directory in walkDirectories([path], self.excludedPaths):
+                        self.addWatch(directory)
+                changedPaths.add(path)
+
+            if changedPaths:
+                timeout = SETTLE_TIME
+
+    def readEvents(self):
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            (wd, mask, cookie, length) = struct.unpack_from(EVENT_HEADER, data, offset)
+            offset += EVENT_HEADER_SIZE
+            name = data[offset:offset + length].rstrip("\0")
+            offset += length
+            yield (wd, mask, name)
+
+
+class PollingWatcher(object):
+
+    name = "polling"
+
+    def __init__(self, directories, excludedPaths, shallowDirectories = [], interval = 1):
+        self.directories = directories
+        self.excludedPaths = excludedPaths
+        self.shallowDirectories = shallowDirectories
+        self.interval = interval
+
+        self.signatures = self.scan()
+
+    def scan(self):
+        signatures = {}
+        for directory in walkDirectories(self.directories, self.excludedPaths, self.shallowDirectories):
+            for entry in os.listdir(directory):
+                path = os.path.join(directory, entry)
+                if path in self.excludedPaths:
+                    continue
+                try:
+                    st = os.stat(path)
+                    signatures[path] = (st.st_size, st.st_mtime, st.st_ino)
+                except OSError:
+                    pass # deleted while scanning
+        return signatures
+
+    """ Blocks until files are changed, and returns the set of changed paths. """
+    def waitForChanges(self):
+        while True:
+            time.sleep(self.interval)
+
+            changedPaths = self.takeChanges()
+            if changedPaths:
+                return changedPaths
+
+    """ Returns the set of paths changed since the last call. """
+    def takeChanges(self):
+        signatures = self.scan()
+        changedPaths = set()
+        for path in set(signatures) | set(self.signatures):
+            if signatures.get(path) != self.signatures.get(path):
+                changedPaths.add(path)
+        self.signatures = signatures
+        return changedPaths
+
+
+""" Creates a watcher for changes in and below the given directories, and in
+    the shallow directories, using inotify if available and falling back to
+    polling otherwise. """
+def createWatcher(directories, excludedPaths, shallowDirectories = []):
+    try:
+        return InotifyWatcher(directories, excludedPaths, shallowDirectories)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(directories, excludedPaths, shallowDirectories)
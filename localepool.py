@@ -0,0 +1,87 @@
+from builderror import BuildError
+
+import sys
+import threading
+import traceback
+
+try:
+    import multiprocessing
+    LOCALE_MP = True
+except ImportError:
+    LOCALE_MP = False
+
+
+# the builder inherited from the parent process, set by the pool initializer
+projectBuilder = None
+
+
+def initializeWorker(builder):
+    global projectBuilder
+    projectBuilder = builder
+
+    # locks may have been held by other threads while forking, like the
+    # threads building other modules with --jobs
+    projectBuilder.hookTimer.lock = threading.Lock()
+    projectBuilder.profiler.lock = threading.Lock()
+    projectBuilder.outputWriter.lock = threading.Lock()
+    if projectBuilder.memo:
+        projectBuilder.memo.lock = threading.Lock()
+
+    # only report what is recorded in this process
+    projectBuilder.hookTimer.takeTimings()
+    projectBuilder.profiler.takeEvents()
+
+""" Runs the locale-specific half of the pipeline in a worker process, and
+    returns a tuple (state, profilerEvents, hookTimings, errorMessage) for the
+    parent process to merge. """
+def buildLocale(locale, moduleName, modulePath):
+    try:
+        projectBuilder.buildLocale(locale, moduleName, modulePath)
+        return (projectBuilder.exportLocaleState(locale, moduleName), projectBuilder.profiler.takeEvents(),
+                projectBuilder.hookTimer.takeTimings(), None)
+    except BuildError, error:
+        # tracebacks cannot be pickled, so report the details from here
+        error.printMessage()
+        return (None, [], {}, str(error))
+    except Exception, exception:
+        traceback.print_exc()
+        return (None, [], {}, str(exception))
+    finally:
+        sys.stdout.flush()
+
+""" Builds all locales of a module using a pool of worker processes. The pool
+    is created for every module, so that the workers are forked with the state
+    of all prerequisites in place. """
+def buildLocales(builder, moduleName, modulePath, processes):
+    if not LOCALE_MP:
+        for locale in builder.locales:
+            builder.buildLocale(locale, moduleName, modulePath)
+        return
+
+    # flush pending output, or the forked workers will repeat it
+    sys.stdout.flush()
+
+    pool = multiprocessing.Pool(min(processes, len(builder.locales)), initializeWorker, (builder,))
+    try:
+        results = []
+        for locale in builder.locales:
+            results.append((locale, pool.apply_async(buildLocale, (locale, moduleName, modulePath))))
+
+        for (locale, result) in results:
+            while not result.ready():
+                result.wait(1) # use a timeout, or we won't respond to Ctrl+C
+
+            (state, profilerEvents, hookTimings, errorMessage) = result.get()
+            builder.profiler.addEvents(profilerEvents)
+            builder.hookTimer.addTimings(hookTimings)
+            if errorMessage is not None:
+                raise BuildError("Could not build module %s for locale %s: %s" % (moduleName, locale, errorMessage))
+
+            builder.importLocaleState(locale, moduleName, state)
+
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,116 @@
+from __future__ import with_statement
+
+import hashlib
+import os
+import time
+
+
+# signatures recorded less than this many seconds after the file's mtime are
+# not trusted, as the file may be modified again within the same mtime tick
+RACY_INTERVAL = 2
+
+
+# Detects which files were modified since they were last read.
+#
+# Every file read is remembered by the hash of its content, under a key
+# consisting of a locale and the file's path ("*" is used for locale-neutral
+# reads). A stat cache remembers the signature (size, mtime, ctime, inode) every
+# file had when it was last hashed, so files whose signature didn't change are
+# not read again. If the signature did change, the content is hashed, so
+# touching a file or checking it out again doesn't trigger a rebuild.
+#
+# If a buildutil.Memo is given, the contents of files are shared with the other
+# builders using it, as long as their signatures don't change.
+class ModifiedFiles(object):
+
+    def __init__(self, memo = None):
+        self.memo = memo
+
+        # path => (signature, content hash, time of hashing)
+        self.statCache = {}
+
+        # locale + ":" + path => content hash at the time of reading
+        self.readHashes = {}
+
+    def getSignature(self, path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime, st.st_ctime, st.st_ino)
+
+    def readFile(self, path, signature):
+        def read():
+            with open(path, "rb") as f:
+                return f.read()
+
+        # a racy signature may not change when the content does
+        if self.memo is None or time.time() - signature[1] <= RACY_INTERVAL:
+            return read()
+        return self.memo.get(("file", path, signature), read)
+
+    def getCachedHash(self, path, signature):
+        if path in self.statCache:
+            (cachedSignature, contentHash, hashTime) = self.statCache[path]
+            if signature == cachedSignature and hashTime - signature[1] > RACY_INTERVAL:
+                return contentHash
+        return None
+
+    def updateStatCache(self, path, signature, content):
+        contentHash = hashlib.md5(content).hexdigest()
+        self.statCache[path] = (signature, contentHash, time.time())
+        return contentHash
+
+    """ Returns the hash of the file's current content, reading the file only
+        if its signature changed since it was last hashed. """
+    def getContentHash(self, path):
+        path = os.path.abspath(path)
+        signature = self.getSignature(path)
+        contentHash = self.getCachedHash(path, signature)
+        if contentHash is None:
+            contentHash = self.updateStatCache(path, signature, self.readFile(path, signature))
+        return contentHash
+
+    """ Returns whether the file was modified since it was last read for the
+        given locale, without marking it as read. """
+    def isModified(self, locale, path):
+        path = os.path.abspath(path)
+        key = locale + ":" + path
+        return not key in self.readHashes or self.readHashes[key] != self.getContentHash(path)
+
+    """ Marks the file as read for the given locale, without reading it if its
+        signature did not change. """
+    def markRead(self, locale, path):
+        path = os.path.abspath(path)
+        self.readHashes[locale + ":" + path] = self.getContentHash(path)
+
+    """ Returns the content of the file, and marks it as read for the given
+        locale. """
+    def readContent(self, locale, path):
+        path = os.path.abspath(path)
+        signature = self.getSignature(path)
+        content = self.readFile(path, signature)
+        self.readHashes[locale + ":" + path] = self.updateStatCache(path, signature, content)
+        return content.decode("utf-8")
+
+    """ Returns the content of the file if it was modified since it was last
+        read for the given locale, or False otherwise. """
+    def read(self, locale, path):
+        path = os.path.abspath(path)
+        key = locale + ":" + path
+        signature = self.getSignature(path)
+
+        if key in self.readHashes and self.getCachedHash(path, signature) == self.readHashes[key]:
+            return False
+
+        content = self.readFile(path, signature)
+        contentHash = self.updateStatCache(path, signature, content)
+        if key in self.readHashes and contentHash == self.readHashes[key]:
+            return False
+
+        self.readHashes[key] = contentHash
+        return content.decode("utf-8")
+
+    """ Forgets that the files accepted by the given filter were read, for all
+        locales, so they are considered modified when they are checked next. """
+    def forget(self, pathFilter):
+        for key in self.readHashes.keys():
+            if pathFilter(key.split(":", 1)[1]):
+                del self.readHashes[key]
@@ -0,0 +1,90 @@
+from __future__ import with_statement
+
+import threading
+
+
+# state every module keeps until the end of the build: the manifest is used by
+# namespace, modules and json-index, and the output files by modules,
+# json-index and the garbage collection of the output writer
+KEPT_KEYS = ("__manifest__", "__built__", "__output__", "__staticMap__")
+
+# state the dependents of a module use while they are built
+PREREQUISITE_KEYS = ("__translations__", "__scssScope__")
+
+# modules used as a whole after all modules are built: json-index rebuilds the
+# boot module from the sources of boot and inline, and tiles and inline add to
+# the concatenated content of inline
+KEPT_MODULES = ("boot", "inline")
+
+
+# Drops the state of modules that is no longer needed once their output files
+# are written, like sources, concatenated content, styles and templates, so
+# that one-shot builds of large projects don't keep the intermediate results of
+# all modules in memory until the end. The state that dependents use is kept
+# until all of them are built.
+#
+# Modules released this way cannot be rebuilt incrementally, so this is only
+# for builds that run once.
+class ModuleReleaser(object):
+
+    def __init__(self, projectBuilder):
+        self.projectBuilder = projectBuilder
+
+        self.lock = threading.Lock()
+
+        # moduleName => number of dependents that still need to be built
+        self.pendingDependents = {}
+
+    """ Counts the dependents of all modules. Call this before building the
+        modules. """
+    def start(self):
+        builder = self.projectBuilder
+        defaultLocale = builder.projectManifest["defaultLocale"]
+
+        self.pendingDependents = dict((module["name"], 0) for module in builder.modules)
+        for module in builder.modules:
+            moduleName = module["name"]
+            builder.loadModuleManifest(moduleName, builder.findModulePath(moduleName))
+            for prerequisite in builder.currentBuild.files[defaultLocale][moduleName]["__manifest__"]["dependencies"]:
+                if prerequisite in self.pendingDependents:
+                    self.pendingDependents[prerequisite] += 1
+
+    """ Releases the intermediate state of a module that was just built, and
+        the state its prerequisites kept for their dependents if it was the
+        last dependent to be built. """
+    def moduleBuilt(self, moduleName):
+        builder = self.projectBuilder
+        defaultLocale = builder.projectManifest["defaultLocale"]
+
+        with self.lock:
+            releasedModules = []
+            if self.pendingDependents.get(moduleName) == 0:
+                releasedModules.append(moduleName)
+            for prerequisite in builder.currentBuild.files[defaultLocale][moduleName]["__manifest__"]["dependencies"]:
+                if prerequisite in self.pendingDependents:
+                    self.pendingDependents[prerequisite] -= 1
+                    if self.pendingDependents[prerequisite] == 0:
+                        releasedModules.append(prerequisite)
+
+        releasedValues = self.releaseModule(moduleName, KEPT_KEYS + PREREQUISITE_KEYS)
+        for releasedModule in releasedModules:
+            releasedValues += self.releaseModule(releasedModule, KEPT_KEYS)
+
+        # the content store would keep the dropped texts alive
+        builder.contentStore.discard(releasedValues)
+
+    """ Drops the state of a module in all locales, apart from the given keys.
+        Returns the dropped values. """
+    def releaseModule(self, moduleName, keptKeys):
+        if moduleName in KEPT_MODULES:
+            return []
+
+        releasedValues = []
+        for modules in self.projectBuilder.currentBuild.files.values():
+            module = modules.get(moduleName)
+            if module is None:
+                continue
+            for key in module.keys():
+                if not key in keptKeys:
+                    releasedValues.append(module.pop(key))
+        return releasedValues
@@ -0,0 +1,149 @@
+# keys of the artifacts a module may have => attributes holding them
+ARTIFACT_ATTRIBUTES = {
+    "__manifest__": "manifest",
+    "__built__": "built",
+    "__output__": "output",
+    "__concat__": "concat",
+    "__styles__": "styles",
+    "__templates__": "templates",
+    "__staticMap__": "staticMap",
+    "__translations__": "translations",
+    "__allTranslations__": "allTranslations",
+    "__scssScope__": "scssScope"
+}
+
+
+""" Returns whether a key names an artifact, like "__concat__", rather than a
+    source file. """
+def isArtifactKey(key):
+    return key.startswith("__") and key.endswith("__")
+
+
+# The state of a module in a single locale. The well-known artifacts, like the
+# manifest and the concatenated content, are kept in attributes, while the
+# contents of source files are kept in a separate map by path, and artifacts
+# added by other features in a map of their own.
+#
+# For compatibility, the state can still be used as the dict it used to be,
+# with artifacts under keys like "__concat__" next to the paths of the source
+# files:
+#
+#     module["__concat__"] is module.concat
+#     module["/path/to/source.js"] is module.sources["/path/to/source.js"]
+#     "__styles__" in module == hasattr(module, "styles")
+class ModuleBuildState(object):
+
+    __slots__ = tuple(ARTIFACT_ATTRIBUTES.values()) + ("sources", "extraArtifacts")
+
+    def __init__(self, state = None):
+        # path => content
+        self.sources = {}
+
+        # key => value, for artifacts of other features
+        self.extraArtifacts = None
+
+        if state:
+            self.update(state)
+
+    def __getitem__(self, key):
+        if key in ARTIFACT_ATTRIBUTES:
+            try:
+                return getattr(self, ARTIFACT_ATTRIBUTES[key])
+            except AttributeError:
+                raise KeyError(key)
+        elif isArtifactKey(key):
+            if self.extraArtifacts is None:
+                raise KeyError(key)
+            return self.extraArtifacts[key]
+        else:
+            return self.sources[key]
+
+    def __setitem__(self, key, value):
+        if key in ARTIFACT_ATTRIBUTES:
+            setattr(self, ARTIFACT_ATTRIBUTES[key], value)
+        elif isArtifactKey(key):
+            if self.extraArtifacts is None:
+                self.extraArtifacts = {}
+            self.extraArtifacts[key] = value
+        else:
+            self.sources[key] = value
+
+    def __delitem__(self, key):
+        if key in ARTIFACT_ATTRIBUTES:
+            try:
+                delattr(self, ARTIFACT_ATTRIBUTES[key])
+            except AttributeError:
+                raise KeyError(key)
+        elif isArtifactKey(key):
+            if self.extraArtifacts is None:
+                raise KeyError(key)
+            del self.extraArtifacts[key]
+        else:
+            del self.sources[key]
+
+    def __contains__(self, key):
+        if key in ARTIFACT_ATTRIBUTES:
+            return hasattr(self, ARTIFACT_ATTRIBUTES[key])
+        elif isArtifactKey(key):
+            return self.extraArtifacts is not None and key in self.extraArtifacts
+        else:
+            return key in self.sources
+
+    has_key = __contains__
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        keys = [key for (key, attribute) in ARTIFACT_ATTRIBUTES.items() if hasattr(self, attribute)]
+        if self.extraArtifacts:
+            keys += self.extraArtifacts.keys()
+        return keys + self.sources.keys()
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default = None):
+        if not key in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def update(self, state):
+        for (key, value) in state.items():
+            self[key] = value
+
+    def clear(self):
+        for attribute in ARTIFACT_ATTRIBUTES.values():
+            if hasattr(self, attribute):
+                delattr(self, attribute)
+        self.sources = {}
+        self.extraArtifacts = None
+
+    # without a __dict__, pickling needs some help
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        self.__init__(state)
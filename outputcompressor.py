@@ -0,0 +1,117 @@
+from __future__ import with_statement
+
+import buildcache
+import buildutil
+import hashlib
+import os
+import sys
+import tempfile
+
+try:
+    import multiprocessing
+    COMPRESSOR_MP = True
+except ImportError:
+    COMPRESSOR_MP = False
+
+
+COMPRESSED_EXTENSIONS = (".js", ".css", ".html", ".json")
+
+
+# Writes a gzipped sibling next to every JavaScript, CSS, HTML and JSON output
+# file, like core.0123456789ab.en_US.js.gz, so that servers can send compressed
+# files without compressing them on every request.
+#
+# Siblings at least as new as their file are up to date, as output files are
+# only written when their content changes. Files that do need compressing are
+# compressed in a pool of worker processes. If a cache directory is given, the
+# compressed content is also kept there, keyed by the hash of the original
+# content, so that content seen before is never compressed again.
+class OutputCompressor(object):
+
+    def __init__(self, outputWriter, buildDir, cacheDir = None):
+        self.outputWriter = outputWriter
+        self.buildDir = buildDir
+        self.cacheDir = cacheDir
+
+        if self.cacheDir and not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    """ Writes the gzipped siblings of the given output files, which map file
+        names to tuples (moduleName, locale). Returns the siblings, mapped the
+        same way. """
+    def compressFiles(self, outputFiles):
+        siblings = {}
+        pending = []
+        for (fileName, owner) in outputFiles.items():
+            if os.path.splitext(fileName)[1] not in COMPRESSED_EXTENSIONS:
+                continue
+
+            siblings[fileName + ".gz"] = owner
+
+            path = self.buildDir + "/" + fileName
+            gzipPath = path + ".gz"
+            if os.path.exists(gzipPath) and os.path.getmtime(gzipPath) >= os.path.getmtime(path):
+                self.outputWriter.claimFile(fileName + ".gz", owner[1])
+                continue
+
+            with open(path, "rb") as f:
+                content = f.read()
+
+            cachePath = self.getCachePath(content)
+            if cachePath and os.path.exists(cachePath):
+                buildcache.touchFile(cachePath)
+                with open(cachePath, "rb") as f:
+                    self.outputWriter.writeFile(fileName + ".gz", f.read(), locale = owner[1])
+            else:
+                pending.append((fileName, owner, content, cachePath))
+
+        if len(pending) > 0:
+            print "Compressing %d output files..." % len(pending)
+
+            contents = [content for (fileName, owner, content, cachePath) in pending]
+            for ((fileName, owner, content, cachePath), compressed) in zip(pending, self.compress(contents)):
+                self.outputWriter.writeFile(fileName + ".gz", compressed, locale = owner[1])
+                if cachePath:
+                    self.storeInCache(cachePath, compressed)
+
+        return siblings
+
+    def compress(self, contents):
+        if not COMPRESSOR_MP or len(contents) == 1 or multiprocessing.cpu_count() == 1:
+            return [buildutil.gzipContent(content) for content in contents]
+
+        # flush pending output, or the forked workers will repeat it
+        sys.stdout.flush()
+
+        pool = multiprocessing.Pool(min(multiprocessing.cpu_count(), len(contents)))
+        try:
+            result = pool.map_async(buildutil.gzipContent, contents)
+            while not result.ready():
+                result.wait(1) # use a timeout, or we won't respond to Ctrl+C
+            compressed = result.get()
+            pool.close()
+            return compressed
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def getCachePath(self, content):
+        if not self.cacheDir:
+            return None
+        return "%s/%s.gz" % (self.cacheDir, hashlib.md5(content).hexdigest())
+
+    def storeInCache(self, cachePath, compressed):
+        # the cache is merely an optimization
+        try:
+            (fd, tempPath) = tempfile.mkstemp(".tmp", "", self.cacheDir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(compressed)
+                os.rename(tempPath, cachePath)
+            except:
+                os.unlink(tempPath)
+                raise
+        except (IOError, OSError), error:
+            print "Could not store compressed file in the cache: %s" % error
@@ -0,0 +1,190 @@
+from __future__ import with_statement
+
+import buildutil
+import os
+import shutil
+import tempfile
+import threading
+
+
+# Writes the output files of a build to the build directory.
+#
+# Files are written to a temporary file first and then renamed, so that a
+# file in the build directory is never seen half-written. Files whose name
+# contains the hash of their content are not written again if they already
+# exist, and other files are only written if their content changed.
+#
+# Outputs of previous builds are not removed as modules get rebuilt, but only
+# after a whole build succeeded, so that a failing build never leaves the
+# build directory without the files referenced by the outputs still in use.
+class OutputWriter(object):
+
+    def __init__(self, buildDir):
+        self.buildDir = buildDir
+
+        self.lock = threading.Lock()
+
+        # files written or reused during the current build, apart from module
+        # outputs, which are listed in the state of the modules
+        # fileName => locale the file belongs to, or None
+        self.currentFiles = {}
+
+        # files that were live after the last successful build
+        self.liveFiles = set()
+
+        # fileName => (content, contentHash) of the files written, for serving
+        # them without reading them back, or None if not kept
+        self.memoryFiles = None
+
+        # mkstemp() creates files only readable by the owner
+        umask = os.umask(0)
+        os.umask(umask)
+        self.fileMode = 0666 & ~umask
+
+    def reset(self):
+        with self.lock:
+            self.currentFiles = {}
+
+    def claimFile(self, fileName, locale = None):
+        with self.lock:
+            self.currentFiles[fileName] = locale
+
+    """ Keeps the content of every file written from now on in memory. """
+    def keepFilesInMemory(self):
+        with self.lock:
+            if self.memoryFiles is None:
+                self.memoryFiles = {}
+
+    """ Returns a tuple (content, contentHash) for a file kept in memory, or
+        None if the file is not kept in memory. """
+    def getFileFromMemory(self, fileName):
+        with self.lock:
+            if self.memoryFiles is None:
+                return None
+            return self.memoryFiles.get(fileName)
+
+    """ Returns the files written or reused during the current build, mapped to
+        the locales they were written for. """
+    def getCurrentFiles(self):
+        with self.lock:
+            return dict(self.currentFiles)
+
+    """ Writes the content, which may be a string, a unicode string or a
+        ChunkBuffer, to the file with the given name in the build directory.
+        Set contentAddressed if the name contains the hash of the content, in
+        which case an existing file is assumed to be identical. The locale is
+        only recorded for files that don't belong to a module. Returns whether
+        the file was actually written. """
+    def writeFile(self, fileName, content, contentAddressed = False, locale = None):
+        self.claimFile(fileName, locale)
+
+        if self.memoryFiles is not None:
+            self.keepInMemory(fileName, content)
+
+        path = self.buildDir + "/" + fileName
+        if os.path.exists(path):
+            if contentAddressed or self.hasContent(path, content):
+                return False
+
+        def writeContent(f):
+            chunks = content.chunks if isinstance(content, buildutil.ChunkBuffer) else [content]
+            for chunk in chunks:
+                f.write(chunk.encode("utf-8") if isinstance(chunk, unicode) else chunk)
+
+        self.writeAtomically(path, writeContent)
+        return True
+
+    """ Copies a file to the file with the given name in the build directory,
+        unless that file exists already. The name should contain the hash of
+        the content. """
+    def copyFile(self, sourcePath, fileName):
+        self.claimFile(fileName)
+
+        # read back from disk when needed
+        with self.lock:
+            if self.memoryFiles is not None:
+                self.memoryFiles.pop(fileName, None)
+
+        path = self.buildDir + "/" + fileName
+        if os.path.exists(path):
+            return False
+
+        def copyContent(f):
+            with open(sourcePath, "rb") as source:
+                shutil.copyfileobj(source, f)
+
+        self.writeAtomically(path, copyContent)
+        return True
+
+    def writeAtomically(self, path, writeContent):
+        (fd, tempPath) = tempfile.mkstemp(".tmp", ".", self.buildDir)
+        try:
+            os.chmod(tempPath, self.fileMode)
+            with os.fdopen(fd, "wb") as f:
+                writeContent(f)
+            os.rename(tempPath, path)
+        except:
+            os.unlink(tempPath)
+            raise
+
+    def keepInMemory(self, fileName, content):
+        if isinstance(content, buildutil.ChunkBuffer):
+            content = content.getText()
+        if isinstance(content, unicode):
+            content = content.encode("utf-8")
+
+        with self.lock:
+            self.memoryFiles[fileName] = (content, buildutil.getContentHash(content))
+
+    def hasContent(self, path, content):
+        if isinstance(content, buildutil.ChunkBuffer):
+            content = content.getText()
+        if isinstance(content, unicode):
+            content = content.encode("utf-8")
+
+        if os.path.getsize(path) != len(content):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == content
+
+    """ Considers the given files live, like the outputs of a previous build
+        in another process, so that the next garbage collection removes them
+        if they are no longer in use. """
+    def addLiveFiles(self, fileNames):
+        with self.lock:
+            self.liveFiles.update(fileNames)
+
+    """ Returns whether all files that were live after the last successful
+        build still exist. """
+    def hasLiveFiles(self):
+        with self.lock:
+            liveFiles = list(self.liveFiles)
+        for fileName in liveFiles:
+            if not os.path.exists(self.buildDir + "/" + fileName):
+                return False
+        return True
+
+    """ Removes the files that were live after the previous successful build
+        but are no longer in use. Call this only after the whole build
+        succeeded, with the output files of all modules. Returns the number of
+        files removed. """
+    def collectGarbage(self, moduleFiles):
+        with self.lock:
+            liveFiles = set(self.currentFiles) | set(moduleFiles)
+
+            numRemoved = 0
+            for fileName in self.liveFiles - liveFiles:
+                try:
+                    os.unlink(self.buildDir + "/" + fileName)
+                    numRemoved += 1
+                except OSError:
+                    pass # removed by someone else already
+
+            self.liveFiles = liveFiles
+
+            if self.memoryFiles is not None:
+                for fileName in self.memoryFiles.keys():
+                    if not fileName in liveFiles:
+                        del self.memoryFiles[fileName]
+
+            return numRemoved
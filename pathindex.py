@@ -0,0 +1,73 @@
+import os
+
+
+# Remembers how the paths used in module manifests resolve to files, so that
+# resolving the same path again doesn't hit the file system.
+#
+# A resolved path only depends on the listings of the directories that were
+# checked to resolve it, so every directory checked is remembered with its
+# modification time. refresh() compares these once per build, and forgets the
+# paths whose directories changed.
+class PathIndex(object):
+
+    def __init__(self, projectDir, shermanDir):
+        self.projectDir = projectDir
+        self.shermanDir = shermanDir
+
+        # (path, directory) => resolved path
+        self.resolvedPaths = {}
+
+        # directory => modification time, or None if it did not exist
+        self.directoryTimes = {}
+
+        # directory => set of (path, directory) keys depending on its listing
+        self.dependentKeys = {}
+
+    def getModificationTime(self, directory):
+        try:
+            return os.stat(directory).st_mtime
+        except OSError:
+            return None
+
+    def watchDirectory(self, directory, key):
+        if not directory in self.directoryTimes:
+            self.directoryTimes[directory] = self.getModificationTime(directory)
+        self.dependentKeys.setdefault(directory, set()).add(key)
+
+    """ Returns the file the path resolves to, or None if there is no such
+        file. Paths starting with a slash are looked up in the project
+        directory first, and in the Sherman directory otherwise. Other paths
+        are relative to the given directory. """
+    def resolve(self, path, directory = ""):
+        key = (path, directory)
+        if key in self.resolvedPaths:
+            return self.resolvedPaths[key]
+
+        if path[0] == "/":
+            candidates = [self.projectDir + path, self.shermanDir + path]
+        else:
+            candidates = [directory + "/" + path]
+
+        for candidate in candidates:
+            self.watchDirectory(os.path.dirname(candidate), key)
+            if os.path.exists(candidate):
+                self.resolvedPaths[key] = candidate
+                return candidate
+
+        return None
+
+    """ Resolves all sources, styles and statics listed in a module manifest.
+        Missing files are reported when they are used. """
+    def indexManifest(self, manifest, modulePath):
+        for (key, subdirectory) in [("sources", "js"), ("styles", "css"), ("statics", "statics")]:
+            for resource in manifest.get(key, []):
+                self.resolve(resource["path"], modulePath + "/" + subdirectory)
+
+    """ Forgets the resolved paths depending on directories that changed since
+        they were last checked. """
+    def refresh(self):
+        for (directory, modificationTime) in self.directoryTimes.items():
+            if self.getModificationTime(directory) != modificationTime:
+                for key in self.dependentKeys.pop(directory, []):
+                    self.resolvedPaths.pop(key, None)
+                del self.directoryTimes[directory]
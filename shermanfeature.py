@@ -1,6 +1,15 @@
+from __future__ import with_statement
+
+import buildutil
+import threading
+
 
 DEFAULT_PRIORITY = 50
 
+# hooks invoked through ProjectBuilder.invokeFeatures()
+HOOK_NAMES = ["manifestLoaded", "sourcesLoaded", "sourcesConcatenated", "modulesWritten",
+              "generateBootstrapCode", "buildFinished"]
+
 
 class Options:
 
@@ -12,9 +21,64 @@ class Options:
         self.featureOptions = featureOptions
 
 
+# Accumulates the time spent in every feature hook. Hooks may be invoked from
+# multiple threads when modules are built concurrently.
+class HookTimer(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # (hookName, featureName) => [number of calls, total seconds]
+        self.timings = {}
+
+    def record(self, hookName, featureName, seconds):
+        with self.lock:
+            if not (hookName, featureName) in self.timings:
+                self.timings[(hookName, featureName)] = [0, 0.0]
+            timing = self.timings[(hookName, featureName)]
+            timing[0] += 1
+            timing[1] += seconds
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+
+    """ Adds timings recorded elsewhere, like in the worker processes building
+        locales. """
+    def addTimings(self, timings):
+        with self.lock:
+            for (key, (calls, seconds)) in timings.items():
+                if not key in self.timings:
+                    self.timings[key] = [0, 0.0]
+                timing = self.timings[key]
+                timing[0] += calls
+                timing[1] += seconds
+
+    """ Returns the timings recorded so far and forgets them, for passing them
+        from a worker process to the parent. """
+    def takeTimings(self):
+        with self.lock:
+            timings = self.timings
+            self.timings = {}
+            return timings
+
+    """ Prints the timings, slowest hooks first. Time spent in hooks that
+        invoke other hooks (like inline does) includes the nested hooks. """
+    def printTimings(self):
+        print "Feature hook timings:"
+        for ((hookName, featureName), (calls, seconds)) in sorted(self.timings.items(), key = lambda item: -item[1][1]):
+            print "  %8.3fs %6d calls  %s.%s" % (seconds, calls, featureName, hookName)
+
+
 class ShermanFeature(object):
 
+    # set by features between sourcesLoaded() and isRebuildNeeded(), which are
+    # invoked from the same thread even when modules are built concurrently
+    rebuildNeeded = buildutil.threadLocalProperty("rebuildNeeded", False)
+
     def __init__(self, options):
+        self.threadState = threading.local()
+
         self.projectDir = options.projectDir
         self.shermanDir = options.shermanDir
         self.buildDir = options.buildDir
@@ -50,6 +114,12 @@ class ShermanFeature(object):
     def sourcesConcatenated(self, locale, moduleName, modulePath):
         pass
 
+    def exportLocaleState(self, locale, moduleName):
+        return None
+
+    def importLocaleState(self, locale, moduleName, state):
+        pass
+
     def modulesWritten(self):
         pass
 
@@ -65,3 +135,16 @@ class ShermanFeature(object):
             func.priority = prio
             return func
         return setPriority
+
+    """ Declares a sourcesLoaded() hook to be locale-neutral. Such hooks are
+        invoked only once per module, with "*" as locale, before the
+        locale-specific hooks are invoked for every locale. """
+    @staticmethod
+    def localeNeutral(func):
+        func.localeNeutral = True
+        return func
+
+
+# default implementations that do nothing, and need not be invoked
+NOOP_HOOKS = set(ShermanFeature.__dict__[hookName] for hookName in
+                 ["sourcesLoaded", "sourcesConcatenated", "modulesWritten", "generateBootstrapCode", "buildFinished"])
@@ -0,0 +1,130 @@
+from __future__ import with_statement
+
+import bootapp
+import cStringIO
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+class BootPageApplicationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.writeFile("project-manifest.json", json.dumps({ "locales": ["en_US", "nl_NL"], "defaultLocale": "nl_NL" }))
+        self.writeBuild("en_US", "v1", "en v1 [static_base] [config]")
+        self.writeBuild("nl_NL", "v1", "nl v1 [static_base] [config]")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def writeFile(self, fileName, content):
+        # replace files atomically, like the builder does
+        with open(self.dir + "/.tmp", "wb") as f:
+            f.write(content)
+        os.rename(self.dir + "/.tmp", self.dir + "/" + fileName)
+
+    def writeBuild(self, locale, version, html, extra = ""):
+        self.writeFile("boot.%s.%s%s.html" % (version, locale, extra), html)
+        self.writeFile("__version__.%s%s.md5" % (locale, extra), version)
+
+    def request(self, application, query = ""):
+        response = {}
+        def startResponse(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+        response["body"] = "".join(application({ "QUERY_STRING": query }, startResponse))
+        return response
+
+    def testServesDefaultLocaleOfManifest(self):
+        response = self.request(bootapp.BootPageApplication(self.dir))
+        self.assertEqual(response["status"], "200 OK")
+        self.assertEqual(response["headers"]["Content-Type"], "text/html")
+        self.assertEqual(response["body"], "nl v1  {}")
+
+    def testServesRequestedLocale(self):
+        response = self.request(bootapp.BootPageApplication(self.dir), "locale=en_US")
+        self.assertEqual(response["body"], "en v1  {}")
+
+    def testRejectsUnknownLocale(self):
+        response = self.request(bootapp.BootPageApplication(self.dir), "locale=../etc")
+        self.assertEqual(response["status"], "400 Bad Request")
+
+    def testInjectsConfig(self):
+        application = bootapp.BootPageApplication(self.dir, staticBase = "http://static/",
+                                                  configProvider = lambda environ, locale: u"{\"locale\":\"%s\"}" % locale)
+        self.assertEqual(self.request(application)["body"], "nl v1 http://static/ {\"locale\":\"nl_NL\"}")
+
+        application = bootapp.BootPageApplication(self.dir, configProvider = bootapp.staticConfig({ "a": 1 }))
+        self.assertEqual(self.request(application)["body"], "nl v1  {\"a\": 1}")
+
+    def testReloadsWhenVersionFileIsReplaced(self):
+        application = bootapp.BootPageApplication(self.dir, checkInterval = 0)
+        self.request(application)
+
+        self.writeBuild("nl_NL", "v2", "nl v2")
+        self.assertEqual(self.request(application)["body"], "nl v2")
+
+    def testChecksVersionFileOncePerInterval(self):
+        application = bootapp.BootPageApplication(self.dir, checkInterval = 3600)
+        self.request(application)
+
+        self.writeBuild("nl_NL", "v2", "nl v2")
+        self.assertEqual(self.request(application)["body"], "nl v1  {}")
+
+    def testKeepsServingWhenNewVersionCannotBeLoaded(self):
+        application = bootapp.BootPageApplication(self.dir, checkInterval = 0)
+        self.request(application)
+
+        self.writeFile("__version__.nl_NL.md5", "missing")
+        stderr = sys.stderr
+        sys.stderr = cStringIO.StringIO()
+        try:
+            self.assertEqual(self.request(application)["body"], "nl v1  {}")
+            self.assertTrue("Could not load boot page for locale nl_NL" in sys.stderr.getvalue())
+        finally:
+            sys.stderr = stderr
+
+        # and picks it up once it's there
+        self.writeFile("boot.missing.nl_NL.html", "nl v3")
+        self.writeFile("__version__.nl_NL.md5", "missing")
+        self.assertEqual(self.request(application)["body"], "nl v3")
+
+    def testKeepsServingWhenVersionFileIsGone(self):
+        application = bootapp.BootPageApplication(self.dir, checkInterval = 0)
+        self.request(application)
+
+        os.unlink(self.dir + "/__version__.nl_NL.md5")
+        self.assertEqual(self.request(application)["body"], "nl v1  {}")
+
+    def testServesDebugBuilds(self):
+        os.unlink(self.dir + "/__version__.en_US.md5")
+        self.writeBuild("en_US", "d1", "en debug", ".debug")
+        response = self.request(bootapp.BootPageApplication(self.dir), "locale=en_US")
+        self.assertEqual(response["body"], "en debug")
+
+    def testNotFoundWithoutBuild(self):
+        os.unlink(self.dir + "/__version__.en_US.md5")
+        response = self.request(bootapp.BootPageApplication(self.dir), "locale=en_US")
+        self.assertEqual(response["status"], "404 Not Found")
+
+    def testWithoutManifest(self):
+        os.unlink(self.dir + "/project-manifest.json")
+        self.assertRaises(ValueError, bootapp.BootPageApplication, self.dir)
+
+        application = bootapp.BootPageApplication(self.dir, defaultLocale = "en_US")
+        self.assertEqual(application.locales, ["en_US", "nl_NL"])
+        self.assertEqual(self.request(application)["body"], "en v1  {}")
+
+        self.assertRaises(ValueError, bootapp.BootPageApplication, self.dir, defaultLocale = "de_DE")
+
+
+if __name__ == "__main__":
+    unittest.main()
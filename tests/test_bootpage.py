@@ -0,0 +1,62 @@
+import bootpage
+import unittest
+
+
+class BootPageTemplateTest(unittest.TestCase):
+
+    def testReplacesPlaceholders(self):
+        template = bootpage.BootPageTemplate("<script src=\"[static_base]boot.js\"></script><script>init([config])</script>")
+        self.assertEqual(template.render("http://static/", "{\"a\":1}"),
+                         "<script src=\"http://static/boot.js\"></script><script>init({\"a\":1})</script>")
+
+    def testReplacesEveryOccurrence(self):
+        template = bootpage.BootPageTemplate("[static_base]a [static_base]b [config][config]")
+        self.assertEqual(template.render("/", "{}"), "/a /b {}{}")
+
+    def testValuesAreNotParsedAgain(self):
+        # like cgi-bin/index.py, with its empty static base
+        template = bootpage.BootPageTemplate("[static_base][config]")
+        self.assertEqual(template.render("", "[static_base]"), "[static_base]")
+
+    def testWithoutPlaceholders(self):
+        self.assertEqual(bootpage.BootPageTemplate("<html></html>").render("/", "{}"), "<html></html>")
+
+
+class BootPageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = bootpage.BootPageCache()
+
+    def testNothingBeforeTheVersionIsSet(self):
+        self.cache.addBootHtml("en_US", "v1", "one [config]")
+        self.assertEqual(self.cache.render("en_US"), None)
+
+    def testRendersCurrentVersion(self):
+        self.cache.addBootHtml("en_US", "v1", "one [config]")
+        self.cache.setVersion("en_US", "v1")
+        self.assertEqual(self.cache.render("en_US"), "one {}")
+        self.assertEqual(self.cache.render("nl_NL"), None)
+
+    def testNewHtmlTakesEffectWithItsVersion(self):
+        self.cache.addBootHtml("en_US", "v1", "one")
+        self.cache.setVersion("en_US", "v1")
+
+        self.cache.addBootHtml("en_US", "v2", "two")
+        self.assertEqual(self.cache.render("en_US"), "one")
+
+        self.cache.setVersion("en_US", "v2")
+        self.assertEqual(self.cache.render("en_US"), "two")
+
+    def testDropsTemplatesOfOtherVersions(self):
+        self.cache.addBootHtml("en_US", "v1", "one")
+        self.cache.addBootHtml("nl_NL", "v1", "een")
+        self.cache.setVersion("en_US", "v1")
+        self.cache.setVersion("nl_NL", "v1")
+
+        self.cache.addBootHtml("en_US", "v2", "two")
+        self.cache.setVersion("en_US", "v2")
+        self.assertEqual(sorted(self.cache.templates), [("en_US", "v2"), ("nl_NL", "v1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
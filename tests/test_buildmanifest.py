@@ -0,0 +1,84 @@
+from __future__ import with_statement
+
+import buildmanifest
+import outputwriter
+import shutil
+import tempfile
+import unittest
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+
+class BuildManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.writer = outputwriter.OutputWriter(self.dir)
+        self.writer.writeFile("core.0123.en_US.js", "core")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def readManifest(self, target = "distribution"):
+        with open(self.dir + "/" + buildmanifest.getManifestFileName(target), "r") as f:
+            return json.load(f)
+
+    def testListsFilesWithTheirOwners(self):
+        buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.0123.en_US.js": ("core", "en_US") })
+
+        manifest = self.readManifest()
+        self.assertEqual(manifest["target"], "distribution")
+        entry = manifest["files"]["core.0123.en_US.js"]
+        self.assertEqual((entry["module"], entry["locale"], entry["size"]), ("core", "en_US", 4))
+        self.assertFalse("gzipSize" in entry)
+
+    def testListsSizeOfGzippedSiblings(self):
+        self.writer.writeFile("core.0123.en_US.js.gz", "compressed")
+        buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, {
+            "core.0123.en_US.js": ("core", "en_US"),
+            "core.0123.en_US.js.gz": ("core", "en_US")
+        })
+
+        files = self.readManifest()["files"]
+        self.assertEqual(files["core.0123.en_US.js"]["gzipSize"], 10)
+        self.assertFalse("gzipSize" in files["core.0123.en_US.js.gz"])
+
+    def testDiffWithPreviousManifest(self):
+        buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.0123.en_US.js": ("core", "en_US") })
+
+        self.writer.writeFile("core.4567.en_US.js", "new core")
+        diff = buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.4567.en_US.js": ("core", "en_US") })
+        self.assertEqual(diff, { "added": ["core.4567.en_US.js"], "changed": [], "removed": ["core.0123.en_US.js"] })
+
+    def testPreviousOutputsOfTheSameTargetOnly(self):
+        buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.0123.en_US.js": ("core", "en_US") })
+
+        self.assertEqual(buildmanifest.BuildManifest(self.dir, "distribution").getPreviousOutputs(), ["core.0123.en_US.js"])
+        self.assertEqual(buildmanifest.BuildManifest(self.dir, "debugging").getPreviousOutputs(), [])
+
+    def testTargetsSharingTheBuildDirectory(self):
+        buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.0123.en_US.js": ("core", "en_US") })
+
+        debugWriter = outputwriter.OutputWriter(self.dir)
+        debugWriter.writeFile("core.en_US.debug.js", "debug core")
+        diff = buildmanifest.BuildManifest(self.dir, "debugging").write(debugWriter, { "core.en_US.debug.js": ("core", "en_US") })
+        self.assertEqual(diff, { "added": ["core.en_US.debug.js"], "changed": [], "removed": [] })
+
+        # the manifest of the other target is left alone
+        self.assertEqual(self.readManifest("distribution")["files"].keys(), ["core.0123.en_US.js"])
+        self.assertEqual(self.readManifest("debugging")["files"].keys(), ["core.en_US.debug.js"])
+
+        diff = buildmanifest.BuildManifest(self.dir, "distribution").write(self.writer, { "core.0123.en_US.js": ("core", "en_US") })
+        self.assertEqual(diff, { "added": [], "changed": [], "removed": [] })
+        self.assertEqual(buildmanifest.BuildManifest(self.dir, "distribution").getPreviousOutputs(), ["core.0123.en_US.js"])
+        self.assertEqual(buildmanifest.BuildManifest(self.dir, "debugging").getPreviousOutputs(), ["core.en_US.debug.js"])
+
+    def testNoPreviousOutputsWithoutManifest(self):
+        self.assertEqual(buildmanifest.BuildManifest(self.dir, "distribution").getPreviousOutputs(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import buildutil
+import cStringIO
+import unittest
+
+
+class ChunkBufferTest(unittest.TestCase):
+
+    def testAppendAndPrepend(self):
+        buffer = buildutil.ChunkBuffer("b")
+        buffer.append("c")
+        buffer.prepend("a")
+        buffer += "d"
+        self.assertEqual(buffer.getText(), "abcd")
+
+    def testEmptyTextIsNotAChunk(self):
+        buffer = buildutil.ChunkBuffer("")
+        buffer.append("")
+        buffer.prepend("")
+        self.assertEqual(len(buffer.chunks), 0)
+        self.assertEqual(buffer.getText(), "")
+
+    def testLengthCoversAllChunks(self):
+        buffer = buildutil.ChunkBuffer("abc")
+        buffer.append(u"de")
+        self.assertEqual(len(buffer), 5)
+
+    def testGetTextJoinsChunksOnce(self):
+        buffer = buildutil.ChunkBuffer("a")
+        buffer.append("b")
+        buffer.append("c")
+        self.assertEqual(buffer.getText(), "abc")
+        self.assertEqual(len(buffer.chunks), 1)
+
+        buffer.append("d")
+        self.assertEqual(buffer.getText(), "abcd")
+
+    def testMapAppliesToEveryChunk(self):
+        buffer = buildutil.ChunkBuffer("a")
+        buffer.append("b")
+        buffer.map(lambda chunk: chunk.upper())
+        self.assertEqual(list(buffer.chunks), ["A", "B"])
+
+    def testWriteTo(self):
+        buffer = buildutil.ChunkBuffer("a")
+        buffer.append("b")
+        f = cStringIO.StringIO()
+        buffer.writeTo(f)
+        self.assertEqual(f.getvalue(), "ab")
+
+
+if __name__ == "__main__":
+    unittest.main()
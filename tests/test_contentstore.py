@@ -0,0 +1,60 @@
+import buildutil
+import contentstore
+import unittest
+
+
+class ContentStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = contentstore.ContentStore()
+
+    def text(self, value):
+        # a new instance for every call, like texts read for every locale
+        return "".join(list(value))
+
+    def testInternReturnsSharedCopy(self):
+        first = self.store.intern(self.text("content"))
+        second = self.store.intern(self.text("content"))
+        self.assertTrue(first is second)
+
+    def testStrAndUnicodeAreKeptApart(self):
+        self.assertTrue(isinstance(self.store.intern(u"content"), unicode))
+        self.assertTrue(isinstance(self.store.intern("content"), str))
+
+    def testInternModule(self):
+        module = { "a": self.text("source"), "__concat__": buildutil.ChunkBuffer(self.text("source")), "__output__": [] }
+        self.store.internModule(module)
+        self.assertTrue(module["a"] is module["__concat__"].chunks[0])
+
+    def testPurgeKeepsTextsOfModules(self):
+        module = { "a": self.text("used"), "__concat__": buildutil.ChunkBuffer(self.text("chunk")) }
+        self.store.internModule(module)
+        self.store.intern(self.text("unused"))
+
+        self.assertEqual(self.store.purge([module]), 2)
+        self.assertTrue(self.store.intern(self.text("used")) is module["a"])
+        self.assertTrue(self.store.intern(self.text("chunk")) is module["__concat__"].chunks[0])
+
+    def testPurgeIgnoresOtherReferences(self):
+        held = self.store.intern(self.text("held"))
+        self.assertEqual(self.store.purge([]), 0)
+        self.assertEqual(held, "held")
+
+    def testPurgeIgnoresEqualCopiesNotInTheStore(self):
+        self.store.intern(self.text("content"))
+        self.assertEqual(self.store.purge([{ "a": self.text("content") }]), 0)
+
+    def testDiscard(self):
+        module = { "a": self.text("first"), "b": self.text("second") }
+        self.store.internModule(module)
+
+        self.store.discard([module.pop("a")])
+        self.assertEqual(self.store.purge([module]), 1)
+
+        # copies that aren't in the store are left alone
+        self.store.discard([self.text("second")])
+        self.assertEqual(len(self.store.contents), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import with_statement
+
+import buildutil
+import modifiedfiles
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+class ModifiedFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = self.dir + "/file.js"
+        self.modifiedFiles = modifiedfiles.ModifiedFiles()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def writeFile(self, content, age = 0):
+        with open(self.path, "wb") as f:
+            f.write(content)
+        if age:
+            mtime = time.time() - age
+            os.utime(self.path, (mtime, mtime))
+
+    def testReadReturnsContentOnlyWhenModified(self):
+        self.writeFile("a", age = 10)
+        self.assertEqual(self.modifiedFiles.read("*", self.path), u"a")
+        self.assertEqual(self.modifiedFiles.read("*", self.path), False)
+
+        self.writeFile("b", age = 5)
+        self.assertEqual(self.modifiedFiles.read("*", self.path), u"b")
+
+    def testLocalesAreTrackedSeparately(self):
+        self.writeFile("a", age = 10)
+        self.modifiedFiles.read("en_US", self.path)
+        self.assertFalse(self.modifiedFiles.isModified("en_US", self.path))
+        self.assertTrue(self.modifiedFiles.isModified("nl_NL", self.path))
+
+    def testTouchingWithoutChangingContentIsNotAModification(self):
+        self.writeFile("a", age = 10)
+        self.modifiedFiles.markRead("*", self.path)
+
+        self.writeFile("a", age = 5)
+        self.assertFalse(self.modifiedFiles.isModified("*", self.path))
+        self.assertEqual(self.modifiedFiles.read("*", self.path), False)
+
+    def testHashOfOldFileIsTrusted(self):
+        self.writeFile("a", age = modifiedfiles.RACY_INTERVAL + 10)
+        signature = self.modifiedFiles.getSignature(self.path)
+        contentHash = self.modifiedFiles.updateStatCache(self.path, signature, "a")
+        self.assertEqual(self.modifiedFiles.getCachedHash(self.path, signature), contentHash)
+
+    def testHashOfRacyFileIsNotTrusted(self):
+        # the file may still change within the same mtime tick, without
+        # changing its signature
+        self.writeFile("a")
+        signature = self.modifiedFiles.getSignature(self.path)
+        self.modifiedFiles.updateStatCache(self.path, signature, "a")
+        self.assertEqual(self.modifiedFiles.getCachedHash(self.path, signature), None)
+
+    def testRacyChangeWithSameSignatureIsDetected(self):
+        self.writeFile("a")
+        self.modifiedFiles.markRead("*", self.path)
+
+        # same size, and an identical signature as far as the stat cache knows
+        signature = self.modifiedFiles.getSignature(self.path)
+        self.writeFile("b")
+        self.modifiedFiles.getSignature = lambda path: signature
+
+        self.assertTrue(self.modifiedFiles.isModified("*", self.path))
+
+    def testChangedSignatureIsNotTrusted(self):
+        self.writeFile("a", age = 10)
+        signature = self.modifiedFiles.getSignature(self.path)
+        self.modifiedFiles.updateStatCache(self.path, signature, "a")
+
+        self.writeFile("bb", age = 5)
+        self.assertEqual(self.modifiedFiles.getCachedHash(self.path, self.modifiedFiles.getSignature(self.path)), None)
+
+    def testRacyFilesAreNotSharedThroughMemo(self):
+        memo = buildutil.Memo()
+        modifiedFiles = modifiedfiles.ModifiedFiles(memo)
+
+        self.writeFile("a")
+        signature = modifiedFiles.getSignature(self.path)
+        modifiedFiles.readFile(self.path, signature)
+        self.assertEqual(len(memo.values), 0)
+
+        self.writeFile("a", age = modifiedfiles.RACY_INTERVAL + 10)
+        signature = modifiedFiles.getSignature(self.path)
+        modifiedFiles.readFile(self.path, signature)
+        self.assertEqual(len(memo.values), 1)
+
+    def testForget(self):
+        self.writeFile("a", age = 10)
+        self.modifiedFiles.read("*", self.path)
+        self.modifiedFiles.forget(lambda path: path == self.path)
+        self.assertEqual(self.modifiedFiles.read("*", self.path), u"a")
+
+
+if __name__ == "__main__":
+    unittest.main()
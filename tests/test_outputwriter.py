@@ -0,0 +1,143 @@
+from __future__ import with_statement
+
+import buildutil
+import os
+import outputwriter
+import shutil
+import tempfile
+import unittest
+
+
+class OutputWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.writer = outputwriter.OutputWriter(self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def readFile(self, fileName):
+        with open(self.dir + "/" + fileName, "rb") as f:
+            return f.read()
+
+    def testWritesFile(self):
+        self.assertTrue(self.writer.writeFile("a.js", "content"))
+        self.assertEqual(self.readFile("a.js"), "content")
+
+    def testWritesUnicodeAsUtf8(self):
+        self.writer.writeFile("a.js", u"\u20ac")
+        self.assertEqual(self.readFile("a.js"), "\xe2\x82\xac")
+
+    def testWritesChunkBuffer(self):
+        buffer = buildutil.ChunkBuffer("a")
+        buffer.append(u"\u20ac")
+        self.writer.writeFile("a.js", buffer)
+        self.assertEqual(self.readFile("a.js"), "a\xe2\x82\xac")
+
+    def testSkipsIdenticalContent(self):
+        self.writer.writeFile("a.js", "content")
+        inode = os.stat(self.dir + "/a.js").st_ino
+
+        self.assertFalse(self.writer.writeFile("a.js", "content"))
+        self.assertEqual(os.stat(self.dir + "/a.js").st_ino, inode)
+
+    def testReplacesChangedContentByRenaming(self):
+        self.writer.writeFile("a.js", "old")
+        with open(self.dir + "/a.js", "rb") as reader:
+            self.assertTrue(self.writer.writeFile("a.js", "new"))
+
+            # readers of the old file are not affected
+            self.assertEqual(reader.read(), "old")
+        self.assertEqual(self.readFile("a.js"), "new")
+
+    def testTrustsExistingContentAddressedFiles(self):
+        self.writer.writeFile("a.0123.js", "content")
+        self.assertFalse(self.writer.writeFile("a.0123.js", "other", contentAddressed = True))
+        self.assertEqual(self.readFile("a.0123.js"), "content")
+
+    def testLeavesNoTemporaryFiles(self):
+        self.writer.writeFile("a.js", "content")
+
+        def failingWrite(f):
+            f.write("partial")
+            raise IOError("disk full")
+        self.assertRaises(IOError, self.writer.writeAtomically, self.dir + "/b.js", failingWrite)
+
+        self.assertEqual(os.listdir(self.dir), ["a.js"])
+
+    def testFilesAreNotOnlyReadableByOwner(self):
+        umask = os.umask(022)
+        try:
+            writer = outputwriter.OutputWriter(self.dir)
+            writer.writeFile("a.js", "content")
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.dir + "/a.js").st_mode & 0777, 0644)
+
+    def testCopyFile(self):
+        sourcePath = self.dir + "/source"
+        with open(sourcePath, "wb") as f:
+            f.write("content")
+        self.assertTrue(self.writer.copyFile(sourcePath, "a.0123.js"))
+        self.assertFalse(self.writer.copyFile(sourcePath, "a.0123.js"))
+        self.assertEqual(self.readFile("a.0123.js"), "content")
+
+    def testRecordsCurrentFilesWithLocales(self):
+        self.writer.writeFile("a.js", "a", locale = "en_US")
+        self.writer.claimFile("b.js")
+        self.assertEqual(self.writer.getCurrentFiles(), { "a.js": "en_US", "b.js": None })
+
+        self.writer.reset()
+        self.assertEqual(self.writer.getCurrentFiles(), {})
+
+    def testCollectsFilesNoLongerInUse(self):
+        self.writer.writeFile("a.js", "a")
+        self.writer.writeFile("b.js", "b")
+        self.assertEqual(self.writer.collectGarbage([]), 0)
+
+        self.writer.reset()
+        self.writer.writeFile("a.js", "a")
+        self.assertEqual(self.writer.collectGarbage([]), 1)
+        self.assertEqual(os.listdir(self.dir), ["a.js"])
+
+    def testKeepsModuleFiles(self):
+        self.writer.writeFile("core.0123.js", "core")
+        self.writer.collectGarbage([])
+
+        self.writer.reset()
+        self.assertEqual(self.writer.collectGarbage(["core.0123.js"]), 0)
+        self.assertTrue(os.path.exists(self.dir + "/core.0123.js"))
+
+    def testCollectsFilesOfPreviousProcesses(self):
+        with open(self.dir + "/stale.js", "wb") as f:
+            f.write("stale")
+
+        self.writer.addLiveFiles(["stale.js"])
+        self.writer.writeFile("a.js", "a")
+        self.assertEqual(self.writer.collectGarbage([]), 1)
+        self.assertFalse(os.path.exists(self.dir + "/stale.js"))
+
+    def testHasLiveFiles(self):
+        self.writer.writeFile("a.js", "a")
+        self.writer.collectGarbage([])
+        self.assertTrue(self.writer.hasLiveFiles())
+
+        os.unlink(self.dir + "/a.js")
+        self.assertFalse(self.writer.hasLiveFiles())
+
+    def testKeepsFilesInMemory(self):
+        self.writer.writeFile("a.js", "before")
+        self.assertEqual(self.writer.getFileFromMemory("a.js"), None)
+
+        self.writer.keepFilesInMemory()
+        self.writer.writeFile("a.js", "content")
+        self.assertEqual(self.writer.getFileFromMemory("a.js"), ("content", buildutil.getContentHash("content")))
+
+        self.writer.reset()
+        self.writer.collectGarbage([])
+        self.assertEqual(self.writer.getFileFromMemory("a.js"), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+from __future__ import with_statement
+
+import os
+import pathindex
+import shutil
+import tempfile
+import unittest
+
+
+class PathIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.projectDir = self.dir + "/project"
+        self.shermanDir = self.dir + "/sherman"
+        for directory in [self.projectDir + "/lib", self.shermanDir + "/lib", self.projectDir + "/modules/core/js"]:
+            os.makedirs(directory)
+        self.index = pathindex.PathIndex(self.projectDir, self.shermanDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def createFile(self, path):
+        with open(path, "w") as f:
+            f.write("")
+
+    def changeDirectory(self, directory):
+        # make sure the modification time differs, whatever its resolution
+        mtime = os.stat(directory).st_mtime + 10
+        os.utime(directory, (mtime, mtime))
+
+    def testAbsolutePathsPreferTheProject(self):
+        self.createFile(self.shermanDir + "/lib/a.js")
+        self.assertEqual(self.index.resolve("/lib/a.js"), self.shermanDir + "/lib/a.js")
+
+        self.createFile(self.projectDir + "/lib/b.js")
+        self.createFile(self.shermanDir + "/lib/b.js")
+        self.assertEqual(self.index.resolve("/lib/b.js"), self.projectDir + "/lib/b.js")
+
+    def testRelativePaths(self):
+        directory = self.projectDir + "/modules/core/js"
+        self.createFile(directory + "/core.js")
+        self.assertEqual(self.index.resolve("core.js", directory), directory + "/core.js")
+
+    def testMissingFile(self):
+        self.assertEqual(self.index.resolve("/lib/missing.js"), None)
+
+    def testResolvedPathsAreRemembered(self):
+        self.createFile(self.shermanDir + "/lib/a.js")
+        self.index.resolve("/lib/a.js")
+
+        # without a refresh, the file system is not checked again
+        self.createFile(self.projectDir + "/lib/a.js")
+        self.changeDirectory(self.projectDir + "/lib")
+        self.assertEqual(self.index.resolve("/lib/a.js"), self.shermanDir + "/lib/a.js")
+
+    def testRefreshForgetsPathsOfChangedDirectories(self):
+        self.createFile(self.shermanDir + "/lib/a.js")
+        self.assertEqual(self.index.resolve("/lib/a.js"), self.shermanDir + "/lib/a.js")
+
+        self.createFile(self.projectDir + "/lib/a.js")
+        self.changeDirectory(self.projectDir + "/lib")
+        self.index.refresh()
+        self.assertEqual(self.index.resolve("/lib/a.js"), self.projectDir + "/lib/a.js")
+
+    def testRefreshFindsFilesThatAppeared(self):
+        self.assertEqual(self.index.resolve("/lib/new.js"), None)
+
+        self.createFile(self.shermanDir + "/lib/new.js")
+        self.changeDirectory(self.shermanDir + "/lib")
+        self.index.refresh()
+        self.assertEqual(self.index.resolve("/lib/new.js"), self.shermanDir + "/lib/new.js")
+
+    def testRefreshKeepsPathsOfUnchangedDirectories(self):
+        self.createFile(self.shermanDir + "/lib/a.js")
+        self.index.resolve("/lib/a.js")
+        self.index.refresh()
+        self.assertTrue(("/lib/a.js", "") in self.index.resolvedPaths)
+
+    def testIndexManifest(self):
+        modulePath = self.projectDir + "/modules/core"
+        self.createFile(modulePath + "/js/core.js")
+        self.createFile(self.shermanDir + "/lib/a.js")
+        self.index.indexManifest({ "sources": [{ "path": "core.js" }, { "path": "/lib/a.js" }] }, modulePath)
+        self.assertEqual(self.index.resolvedPaths[("core.js", modulePath + "/js")], modulePath + "/js/core.js")
+        self.assertEqual(self.index.resolvedPaths[("/lib/a.js", modulePath + "/js")], self.shermanDir + "/lib/a.js")
+
+
+if __name__ == "__main__":
+    unittest.main()